@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 # VÉGLEGES, EGYSÉGESÍTETT ADATFELDOLGOZÓ PIPELINE (DEFENZÍV LOGIKÁVAL)
 
+import argparse
+from collections import Counter
 import logging
 from pathlib import Path
 import sys
@@ -13,102 +15,344 @@ try:
     core_path = current_dir / "core"
     if str(core_path) not in sys.path:
         sys.path.insert(0, str(core_path))
-    from file_processor import FileProcessor
+    from file_processor import STANDARD_COLUMNS, FileProcessor
     from duplicate_handler import DuplicateHandler
+    from ingest_manifest import IngestManifest
+    from parallel_ingest import load_files_parallel
+    from csv_engines import ENGINE_CHOICES
+    from streaming_pipeline import StreamingPipeline, log_streaming_result
+    from dataset_store import SORT_COLUMNS, STORE_CHOICES, CsvStore, create_store, migrate_csv, output_frame, store_for_backup
+    from column_cache import ColumnCache
+    from dense_grid import DenseGrid
+    from rollups import RollupCache
+    from backup_store import KEEP_DAILY, KEEP_MONTHLY
 except ImportError as e:
     print(f"❌ Kritikus hiba: Nem sikerült betölteni a core modulokat: {e}")
     sys.exit(1)
 
-def main():
-    """A teljes adatfeldolgozási láncot futtató fő függvény."""
-    fp = FileProcessor()
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parancssori kapcsolók feldolgozása."""
+    parser = argparse.ArgumentParser(description="Energia adatok feldolgozása és tisztítása.")
+    parser.add_argument("--full", action="store_true", help="Teljes újraépítés a manifeszttől függetlenül.")
+    parser.add_argument("--workers", type=int, default=1, help="Párhuzamos beolvasó folyamatok száma (1 = soros, 0 = CPU-k száma).")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="auto", help="CSV beolvasó motor (auto = pyarrow, ha telepítve van).")
+    parser.add_argument("--arrow-dtypes", action="store_true", help="Arrow alapú oszloptípusok a pyarrow motorral.")
+    parser.add_argument("--stream", action="store_true", help="Darabolt feldolgozás korlátos memóriával (nagy exportokhoz).")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Darabméret sorokban --stream módban.")
+    parser.add_argument("--store", choices=STORE_CHOICES, default="auto", help="A tisztított adatkészlet tárolója (auto = particionált Parquet, ha a pyarrow telepítve van).")
+    parser.add_argument("--compact", action="store_true", help="A szegmens tároló teljes tömörítése a feldolgozás előtt (--store segments).")
+    parser.add_argument("--keep-daily", type=int, default=KEEP_DAILY, help="Ennyi nap utolsó biztonsági mentése marad meg.")
+    parser.add_argument("--keep-monthly", type=int, default=KEEP_MONTHLY, help="Ennyi hónap utolsó biztonsági mentése marad meg.")
+    parser.add_argument("--list-backups", action="store_true", help="A biztonsági mentések listázása, feldolgozás nélkül.")
+    parser.add_argument("--restore", metavar="AZONOSITO", help="Egy biztonsági mentés visszaállítása ('latest' = a legutóbbi), feldolgozás nélkül.")
+    parser.add_argument("--watch", action="store_true", help="Folyamatos figyelés: a CSV-eredeti mappába érkező fájlok automatikus feldolgozása.")
+    parser.add_argument("--settle", type=float, default=2.0, help="Ennyi másodpercig változatlan méretű fájl számít befejezettnek (--watch).")
+    parser.add_argument("--batch-window", type=float, default=5.0, help="Ennyi másodperc csend után indul a köteg feldolgozása (--watch).")
+    return parser.parse_args(argv)
+
+def log_datetime_stats(fp: FileProcessor) -> None:
+    """A dátumértelmezés tartalék útjának aránya a futási naplóba."""
+    for name, stats in sorted(fp.datetime_report.items()):
+        if stats.fallback or stats.failed:
+            logging.warning(f"⚠️ '{name}': {stats.fallback} dátum tartalék úton, {stats.failed} értelmezhetetlen.")
+    total = fp.datetime_parser.stats
+    logging.info(f"🕒 Dátumértelmezés: {total.parsed} explicit formátummal, {total.fallback} tartalék úton ({total.fallback_rate:.2f}%), {total.failed} sikertelen.")
+
+def migrate_legacy_csv(fp: FileProcessor, store) -> bool:
+    """Egyszeri átállás: ha a tároló még üres, de a régi tisztított CSV megvan, azt írjuk át."""
+    legacy = CsvStore(fp.output_dir, fp)
+    if store.name == legacy.name or store.exists() or not legacy.exists():
+        return False
+    if not migrate_csv(store, legacy.location):
+        logging.warning("⚠️ A régi CSV átírása nem sikerült, teljes újraépítés következik.")
+        return False
+    fp.backup_file(legacy.location)
+    legacy.location.unlink()
+    return True
+
+def refresh_column_cache(fp: FileProcessor, store, manifest: IngestManifest) -> None:
+    """A GUI memórialeképezett oszlopainak újraírása a tároló aktuális tartalmából."""
+    try:
+        cache = ColumnCache(fp.output_dir)
+        rows = cache.build(store.iter_frames(), manifest.dataset_version, store.name)
+        bytes_per_row = cache.header["bytes_per_row"]
+        logging.info(f"🗂️ Oszlop-gyorsítótár frissítve: {rows} sor, {bytes_per_row} bájt/sor ({rows * bytes_per_row / 2**20:.1f} MB).")
+    except Exception as e:
+        logging.warning(f"⚠️ Az oszlop-gyorsítótár nem frissíthető ({e}), a GUI a tárolóból olvas.")
+
+def refresh_dense_grid(fp: FileProcessor, store, manifest: IngestManifest) -> None:
+    """A 15 perces rács újraépítése az (aktuális) oszlop-gyorsítótárból."""
+    try:
+        columns = ColumnCache(fp.output_dir)
+        if not columns.open(manifest.dataset_version):
+            logging.warning("⚠️ Az oszlop-gyorsítótár nem elérhető, a 15 perces rács nem frissíthető.")
+            return
+        grid = DenseGrid(fp.output_dir)
+        if grid.build(columns.data, manifest.dataset_version, store.name):
+            missing = grid.missing_count() if grid.open(manifest.dataset_version) else 0
+            logging.info(f"🧮 15 perces rács frissítve: {grid.header['meters']} mérő × {grid.header['slots']} negyedóra, {missing} hiányzó.")
+        else:
+            logging.info(f"ℹ️ A 15 perces rács nem alkalmazható ({grid.header['reason']}), a lekérdezések a többi úton mennek.")
+    except Exception as e:
+        logging.warning(f"⚠️ A 15 perces rács nem frissíthető ({e}), a GUI a többi úton kérdez le.")
+
+def refresh_rollups(fp: FileProcessor, store, manifest: IngestManifest, changed=None) -> None:
+    """Az órás/napi/heti/havi összesítő táblák frissítése (changed: az új adatok időszaka, ha ismert)."""
+    try:
+        mode = RollupCache(fp.output_dir).update(store, manifest.dataset_version, changed)
+        logging.info(f"📊 Összesítő táblák frissítve ({'inkrementálisan' if mode == 'incremental' else 'teljes újraszámolással'}).")
+    except Exception as e:
+        logging.warning(f"⚠️ Az összesítő táblák nem frissíthetők ({e}), a GUI a nyers sorokból aggregál.")
+
+def publish_dataset(fp: FileProcessor, store, manifest: IngestManifest, changed=None) -> None:
+    """Új adatkészlet-verzió: az oszlop-gyorsítótár, a 15 perces rács és az összesítő táblák frissítése, a manifeszt mentése, az elavult normalizált gyorsítótár törlése."""
+    manifest.dataset_version += 1
+    refresh_column_cache(fp, store, manifest)
+    refresh_dense_grid(fp, store, manifest)
+    refresh_rollups(fp, store, manifest, changed)
+    manifest.save()
+    fp.sidecars.prune({entry.sha256 for entry in manifest.entries.values() if entry.sha256})
+    logging.info(f"✅ Végleges, tiszta adatkészlet sikeresen elmentve ide: {store.location} (verzió: {manifest.dataset_version})")
+
+def run_streaming(args, fp, dh, manifest, files_to_load, store, incremental) -> int:
+    """A STEP 1-4 darabolt változata: a fájlok darabonként haladnak végig a láncon."""
+    logging.info(f"Darabolt mód: {len(files_to_load)} fájl, {args.chunksize} soros darabok.")
+    pipeline = StreamingPipeline(fp, dh, chunksize=args.chunksize)
+    try:
+        result = pipeline.run(files_to_load, store, incremental=incremental)
+    except Exception as e:
+        logging.critical(f"❌ A darabolt feldolgozás megszakadt, a kimeneti fájl változatlan: {e}")
+        return 1
+
+    for file_path in files_to_load:
+        stats = result.file_stats.get(file_path)
+        if stats is None or stats.row_count == 0:
+            manifest.record_stats(file_path, 0, None, None)
+        else:
+            manifest.record_stats(file_path, stats.row_count, stats.date_start, stats.date_end)
+    log_streaming_result(result)
+    log_datetime_stats(fp)
+
+    if result.output_rows == 0:
+        manifest.save()
+        if incremental:
+            logging.warning("⚠️ Az új fájlok egyike sem normalizálható, a meglévő adatfájl változatlan marad.")
+            return 0
+        logging.critical("❌ Egyetlen CSV fájlt sem sikerült sikeresen normalizálni. A folyamat leáll.")
+        return 1
+    changed = None
+    if incremental:
+        ranges = [(stats.date_start, stats.date_end) for stats in result.file_stats.values() if stats.row_count]
+        if not ranges:
+            # A CSV tároló a meglévő hónapokat újraírja (output_rows > 0), de új sor nem érkezett
+            manifest.save()
+            logging.warning("⚠️ Az új fájlok egyetlen érvényes sort sem tartalmaznak, a meglévő adatkészlet változatlan.")
+            return 0
+        changed = (min(r[0] for r in ranges), max(r[1] for r in ranges))
+    publish_dataset(fp, store, manifest, changed)
+    return 0
+
+def create_file_processor(args: argparse.Namespace) -> FileProcessor:
+    return FileProcessor(engine=args.engine, arrow_dtypes=args.arrow_dtypes, keep_daily=args.keep_daily, keep_monthly=args.keep_monthly)
+
+def list_backups(args: argparse.Namespace) -> int:
+    """A meglévő mentések kiírása (azonosító, időpont, méret, darabszám)."""
+    snapshots = create_file_processor(args).backups.list_snapshots()
+    if not snapshots:
+        logging.info("Nincs biztonsági mentés.")
+    for snapshot in snapshots:
+        files = f", {len(snapshot.files)} fájl" if snapshot.files else ""
+        reason = "  (visszaállítás előtti állapot)" if snapshot.reason == "restore" else ""
+        logging.info(f"💾 {snapshot.id}  {snapshot.created}  {snapshot.source}  {snapshot.size} bájt, {len(snapshot.digests())} darab{files}{reason}")
+    return 0
+
+def run_restore(args: argparse.Namespace) -> int:
+    """
+    Egy mentés visszaállítása abba a tárolóba, amelyről készült (CSV, Parquet, SQLite, szegmensek).
+
+    A felülírt állapotról előbb mentés készül, így a visszaállítás is
+    visszavonható. A visszaállított tároló lesz az aktív; a manifesztből
+    kikerülnek a mentésben nem szereplő fájlok, így a következő futás újra
+    beolvassa őket (fájllista nélküli, régi mentésnél teljes újraépítés jön).
+    """
+    fp = create_file_processor(args)
+    snapshot = fp.backups.resolve(args.restore)
+    if snapshot is None:
+        logging.error(f"❌ Nincs ilyen mentés: '{args.restore}'")
+        return 1
+    target = store_for_backup(snapshot.source, fp)
+    if target is None:
+        logging.error(f"❌ A(z) '{snapshot.source}' mentéshez nincs elérhető tároló (pl. hiányzó pyarrow).")
+        return 1
+    target.backup(reason="restore")
+    if not fp.backups.restore(snapshot, target.location):
+        return 1
+    target = store_for_backup(snapshot.source, fp)  # a nyilvántartások (partíciók, szegmensek) újraolvasása
+    manifest = IngestManifest(fp.output_dir / "ingest_manifest.json")
+    if manifest.store not in (None, target.name):
+        logging.warning(f"⚠️ Az aktív tároló eddig '{manifest.store}' volt, mostantól '{target.name}'; a további futásokhoz: --store {target.name}.")
+    manifest.store = target.name
+    if snapshot.ingested is None:
+        manifest.reset()
+        logging.warning("⚠️ A mentés nem rögzítette a beolvasott fájlokat, a következő futás teljes újraépítést végez.")
+    elif forgotten := manifest.keep_only(snapshot.ingested):
+        logging.warning(f"⚠️ A mentés után beolvasott {len(forgotten)} fájl sorai nincsenek a visszaállított adatkészletben, a következő futás újra beolvassa őket: {', '.join(forgotten)}")
+    publish_dataset(fp, target, manifest)
+    return 0
+
+def run_pipeline(args: argparse.Namespace) -> int:
+    """A teljes adatfeldolgozási lánc egy futása; a visszatérési érték a kilépési kód."""
+    fp = create_file_processor(args)
     dh = DuplicateHandler(strategy="emergency_fix_v1")
-    
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s", handlers=[logging.StreamHandler(sys.stdout)])
 
     logging.info("-" * 50)
     logging.info("STEP 1: Fájlok beolvasása")
     logging.info("-" * 50)
 
-    all_files = sorted(list(fp.input_dir.glob("*.csv")))
+    all_files = fp.list_input_files()
     if not all_files:
         logging.warning(f"Nincsenek feldolgozandó CSV fájlok a(z) '{fp.input_dir}' mappában.")
-        sys.exit(0)
+        return 0
+
+    store = create_store(args.store, fp)
+    manifest = IngestManifest(fp.output_dir / "ingest_manifest.json")
+    if migrate_legacy_csv(fp, store):
+        manifest.store = store.name  # a nyilvántartás az átírt adatkészletre is érvényes
+    if args.compact and hasattr(store, "compact"):
+        store.compact(full=True)
+    diff = manifest.classify(all_files)
+    full = args.full or manifest.store not in (None, store.name)
+    if full and not args.full:
+        logging.info(f"A tároló megváltozott ({manifest.store} → {store.name}), teljes újraépítés következik.")
+    manifest.store = store.name
+
+    if not full and not diff.has_work and store.exists():
+        if not ColumnCache(fp.output_dir).open(manifest.dataset_version):
+            refresh_column_cache(fp, store, manifest)
+        grid = DenseGrid(fp.output_dir)
+        if not grid.open(manifest.dataset_version) and grid.header is None:  # a nem alkalmazható rácsot nem építjük újra
+            refresh_dense_grid(fp, store, manifest)
+        if not RollupCache(fp.output_dir).open(manifest.dataset_version):
+            refresh_rollups(fp, store, manifest)
+        manifest.save()
+        logging.info(f"✅ Nincs új vagy módosult fájl ({len(diff.unchanged)} változatlan), a tisztított adatfájl naprakész.")
+        return 0
+
+    incremental = not full and store.exists() and manifest.can_append(diff)
+    if incremental:
+        files_to_load = diff.new
+        logging.info(f"Inkrementális feldolgozás: {len(diff.new)} új fájl, {len(diff.unchanged)} változatlan.")
+    else:
+        files_to_load = all_files
+        manifest.reset()
+        logging.info(f"Teljes újraépítés: {len(all_files)} fájl (új: {len(diff.new)}, módosult: {len(diff.changed)}, törölt: {len(diff.removed)}).")
 
-    all_dataframes = [(fp.load_csv_file(file_path), file_path.name) for file_path in all_files]
+    if args.stream:
+        return run_streaming(args, fp, dh, manifest, files_to_load, store, incremental)
+
+    if args.workers != 1 and len(files_to_load) > 1:
+        loaded = load_files_parallel(fp, files_to_load, args.workers)
+    else:
+        loaded = [fp.load_clean_file(file_path) for file_path in files_to_load]
+    all_dataframes = list(zip(loaded, files_to_load))
+    detection_paths = Counter(fmt.detection for fmt in fp.detection_report.values())
+    for detection, count in sorted(detection_paths.items()):
+        logging.info(f"🔎 Formátumfelismerés '{detection}': {count} fájl")
+    log_datetime_stats(fp)
     
     logging.info("\n" + "-" * 50)
     logging.info("STEP 2: Adatkeretek validálása és normalizálása (fájlonként)")
     logging.info("-" * 50)
 
-    standard_columns = ['Gyariszam', 'Azonosito', 'Kezdo_datum', 'Zaro_datum', 'Hatasos_ertek_kWh']
-    
-    column_map = {
-        'gyáriszám': 'Gyariszam',
-        'azonosító': 'Azonosito',
-        'kezdő dátum': 'Kezdo_datum',
-        'záró dátum': 'Zaro_datum',
-        'hatásos érték [kwh]': 'Hatasos_ertek_kWh'
-    }
-
     normalized_dfs = []
-    for df, filename in all_dataframes:
+    for df, file_path in all_dataframes:
         if df is None:
+            manifest.record(file_path, None)
+            logging.warning(f"⚠️ '{file_path.name}' kihagyva: nem olvasható vagy hiányzó oszlopok. Szükséges: {STANDARD_COLUMNS}")
             continue
-
-        original_columns = df.columns
-        rename_map = {}
-        found_cols = set()
-
-        for col in original_columns:
-            clean_col = str(col).strip().lower().replace('_', ' ')
-            if clean_col in column_map:
-                standard_name = column_map[clean_col]
-                rename_map[col] = standard_name
-                found_cols.add(standard_name)
-        
-        if set(standard_columns).issubset(found_cols):
-            normalized_df = df.rename(columns=rename_map)
-            normalized_dfs.append(normalized_df[standard_columns])
-            logging.info(f"✅ '{filename}' sikeresen normalizálva.")
-        else:
-            logging.warning(f"⚠️ '{filename}' kihagyva: hiányzó oszlopok. Szükséges: {standard_columns}, Talált: {list(found_cols)}")
+        normalized_dfs.append((df, file_path))
+        logging.info(f"✅ '{file_path.name}' sikeresen normalizálva.")
 
     if not normalized_dfs:
+        if incremental:
+            manifest.save()
+            logging.warning("⚠️ Az új fájlok egyike sem normalizálható, a meglévő adatfájl változatlan marad.")
+            return 0
         logging.critical("❌ Egyetlen CSV fájlt sem sikerült sikeresen normalizálni. A folyamat leáll.")
-        sys.exit(1)
-
-    combined_df = pd.concat(normalized_dfs, ignore_index=True)
-    logging.info(f"Normalizált adatok összefűzve: {len(combined_df)} sor.")
+        return 1
 
     logging.info("\n" + "-" * 50)
     logging.info("STEP 3: Adattisztítás és duplikáció-szűrés")
     logging.info("-" * 50)
-    
-    df_filtered = combined_df.copy()
-    df_filtered['Hatasos_ertek_kWh'] = pd.to_numeric(df_filtered['Hatasos_ertek_kWh'].astype(str).str.replace(',', '.'), errors='coerce')
-    df_filtered['Kezdo_datum'] = pd.to_datetime(df_filtered['Kezdo_datum'], errors='coerce')
-    df_filtered['Zaro_datum'] = pd.to_datetime(df_filtered['Zaro_datum'], errors='coerce')
-    df_filtered.dropna(subset=['Kezdo_datum', 'Zaro_datum', 'Hatasos_ertek_kWh'], inplace=True)
+
+    for cleaned_df, file_path in normalized_dfs:
+        manifest.record(file_path, cleaned_df)
+
+    df_filtered = pd.concat([cleaned_df for cleaned_df, _ in normalized_dfs], ignore_index=True)
+    logging.info(f"Normalizált adatok összefűzve: {len(df_filtered)} sor.")
     
     final_df = dh.remove_duplicates(df_filtered, keep_strategy='last')
     stats = dh.get_duplication_statistics()
     logging.info(f"Duplikáció-szűrés után: {stats.final_count} sor maradt (eltávolítva: {stats.removed_total}).")
 
+    if final_df.empty:
+        # Beolvasható, de egyetlen érvényes sort sem adó fájlok (pl. értelmezhetetlen dátumok)
+        if incremental:
+            manifest.save()
+            logging.warning("⚠️ Az új fájlok egyetlen érvényes sort sem tartalmaznak, a meglévő adatfájl változatlan marad.")
+            return 0
+        logging.critical("❌ A normalizált fájlok egyetlen érvényes sort sem tartalmaznak. A folyamat leáll.")
+        return 1
+
     logging.info("\n" + "-" * 50)
     logging.info("STEP 4: Végeredmény mentése")
     logging.info("-" * 50)
     
-    output_df = final_df[['Kezdo_datum', 'Hatasos_ertek_kWh']].sort_values(by="Kezdo_datum").reset_index(drop=True)
-    output_path = fp.output_dir / "energia_adatok_tisztitott.csv"
-    
-    if fp.save_csv_file(output_df, output_path):
-        logging.info(f"✅ Végleges, tiszta adatfájl sikeresen elmentve ide: {output_path}")
+    output_df = output_frame(final_df, fp.meters)
+    if incremental:
+        saved = store.merge(output_df)
     else:
-        logging.error("❌ A végleges adatfájl mentése SIKERTELEN.")
-        sys.exit(1)
+        saved = store.write(output_df.sort_values(by=SORT_COLUMNS).reset_index(drop=True))
 
-if __name__ == "__main__":
-    main()
+    if saved:
+        changed = (output_df['Kezdo_datum'].min(), output_df['Kezdo_datum'].max()) if incremental else None
+        publish_dataset(fp, store, manifest, changed)
+        return 0
+    logging.error("❌ A végleges adatfájl mentése SIKERTELEN.")
+    return 1
+
+def main(argv: list[str] | None = None):
+    """A teljes adatfeldolgozási láncot futtató fő függvény."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s", handlers=[logging.StreamHandler(sys.stdout)])
+
+    if args.list_backups:
+        sys.exit(list_backups(args))
+    if args.restore:
+        sys.exit(run_restore(args))
 
+    if args.watch:
+        from watch_daemon import WatchDaemon
 
+        def ingest_batch(batch: list[Path]) -> None:
+            if batch:
+                logging.info(f"📥 Új exportok érkeztek ({len(batch)}): {', '.join(p.name for p in batch)}")
+            try:
+                exit_code = run_pipeline(args)
+            except Exception:
+                # Egy hibás köteg nem állíthatja le a démont
+                logging.exception("❌ A kötegelt feldolgozás kivétellel megszakadt, várakozás a következő változásra.")
+                return
+            if exit_code:
+                logging.error(f"❌ A kötegelt feldolgozás sikertelen (kód: {exit_code}), várakozás a következő változásra.")
+
+        fp = create_file_processor(args)
+        WatchDaemon(fp, ingest_batch, settle_seconds=args.settle, batch_window=args.batch_window).run_forever()
+        return
+
+    exit_code = run_pipeline(args)
+    if exit_code:
+        sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
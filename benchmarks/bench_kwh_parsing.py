@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# BENCHMARK: TIZEDESVESSZŐS kWh OSZLOP BEOLVASÁSA
+
+"""
+Egy év 15 perces adatán (35 040 sor) összeveti a régi, szöveges
+kWh-konverziót (str → replace(',', '.') → to_numeric) a parserben
+történő, decimal=',' alapú beolvasással.
+
+Futtatás: python benchmarks/bench_kwh_parsing.py [ismétlések]
+"""
+
+import io
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def make_year_csv() -> bytes:
+    """Egy év szintetikus, közmű formátumú exportja cp1250 kódolással."""
+    rng = np.random.default_rng(42)
+    start = datetime(2024, 1, 1)
+    lines = ["Gyáriszám;Azonosító;Kezdő dátum;Záró dátum;Hatásos érték [kWh];Meddő érték [kVArh];Státusz"]
+    for i in range(366 * 96):
+        t = start + timedelta(minutes=15 * i)
+        value = f"{rng.random():.3f}".replace(".", ",")
+        lines.append(f"12345678;HU000120;{t:%Y.%m.%d. %H:%M};{t + timedelta(minutes=15):%Y.%m.%d. %H:%M};{value};0,000;OK")
+    return "\n".join(lines).encode("cp1250")
+
+
+def old_path(raw: bytes) -> pd.Series:
+    df = pd.read_csv(io.BytesIO(raw), sep=";", encoding="cp1250", usecols=["Hatásos érték [kWh]"], dtype=str)
+    return pd.to_numeric(df["Hatásos érték [kWh]"].astype(str).str.replace(",", "."), errors="coerce")
+
+
+def native_path(raw: bytes) -> pd.Series:
+    df = pd.read_csv(io.BytesIO(raw), sep=";", encoding="cp1250", usecols=["Hatásos érték [kWh]"], decimal=",")
+    return df["Hatásos érték [kWh]"]
+
+
+def best_of(func, raw: bytes, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func(raw)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    raw = make_year_csv()
+    assert np.array_equal(old_path(raw).to_numpy(), native_path(raw).to_numpy())
+
+    old_t = best_of(old_path, raw, repeats)
+    new_t = best_of(native_path, raw, repeats)
+    print(f"📊 kWh beolvasás, {366 * 96:,} sor (legjobb {repeats} futásból):")
+    print(f"   🐢 Szöveges konverzió:  {old_t * 1000:8.2f} ms")
+    print(f"   ⚡ decimal=',' parser: {new_t * 1000:8.2f} ms")
+    print(f"   🚀 Gyorsulás: {old_t / new_t:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
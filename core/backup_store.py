@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# TARTALOMCÍMZETT, INKREMENTÁLIS BIZTONSÁGI MENTÉSEK MEGŐRZÉSI SZABÁLLYAL
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+KEEP_DAILY = 7
+KEEP_MONTHLY = 12
+MAX_CHUNK_BYTES = 4 * 1024 * 1024  # hónap nélküli soroknál és nem CSV fájloknál ennyinként vágunk
+# Az ennél frissebb mtime-ú fájl darablistáját a következő mentés nem veszi át
+# (a durva időbélyegű fájlrendszereken az azonos pillanatban újraírt fájl mtime-ja nem változna)
+RACY_MTIME_NS = 2 * 10**9
+
+
+@dataclass
+class Snapshot:
+    """
+    Egy mentett fájl- vagy mappaállapot: a darabok hash-ei sorrendben és a teljes tartalom lenyomata.
+
+    Mappa (Parquet partíciók, szegmensek) mentésénél a chunks üres, a files
+    fájlonként tartalmazza a relatív utat, a méretet, az mtime-ot, a lenyomatot
+    és a darabokat; a sha256 ekkor a (relatív út, fájl-lenyomat) párok lenyomata.
+    Az ingested a mentett állapotba beolvasott forrásfájlok neve és lenyomata
+    (a régebbi mentéseknél None), a reason a mentés oka: 'write' (felülírás
+    előtt) vagy 'restore' (a visszaállítás által felülírt állapot).
+    """
+
+    id: str
+    created: str
+    source: str
+    size: int
+    sha256: str
+    chunks: list[str]
+    files: list[dict] = field(default_factory=list)
+    ingested: dict[str, str] | None = None
+    reason: str = "write"
+
+    def digests(self) -> set[str]:
+        """A mentés által hivatkozott összes darab."""
+        return set(self.chunks) | {digest for entry in self.files for digest in entry["chunks"]}
+
+
+def iter_month_chunks(path: Path):
+    """
+    A fájl darabolása hónaponként.
+
+    A darabhatár ott van, ahol a sor eleji 'ÉÉÉÉ-HH' előtag változik (a
+    tisztított CSV sorai ezzel kezdődnek), így a változatlan hónapok darabja
+    és hash-e mentésről mentésre azonos. Az első sor (BOM + fejléc) külön darab.
+    """
+    current_key, buffer = None, []
+    size = 0
+    with open(path, "rb") as fh:
+        header = fh.readline()
+        if header:
+            yield header
+        for line in fh:
+            key = line[:7] if line[4:5] == b"-" else None
+            if buffer and (key != current_key or size >= MAX_CHUNK_BYTES):
+                yield b"".join(buffer)
+                buffer, size = [], 0
+            current_key = key
+            buffer.append(line)
+            size += len(line)
+    if buffer:
+        yield b"".join(buffer)
+
+
+def iter_fixed_chunks(path: Path):
+    """Bináris fájl (Parquet partíció, SQLite adatbázis, szegmens) darabolása fix méretű szeletekre."""
+    with open(path, "rb") as fh:
+        while data := fh.read(MAX_CHUNK_BYTES):
+            yield data
+
+
+def iter_file_chunks(path: Path):
+    return iter_month_chunks(path) if path.suffix == ".csv" else iter_fixed_chunks(path)
+
+
+def directory_digest(files: list[dict]) -> str:
+    whole = hashlib.sha256()
+    for entry in files:
+        whole.update(f"{entry['path']}\0{entry['sha256']}\n".encode("utf-8"))
+    return whole.hexdigest()
+
+
+class BackupStore:
+    """
+    Tartalomcímzett mentések: objects/ alatt hash szerint tömörített darabok, snapshots/ alatt a mentések leírói.
+
+    Egy új mentés csak a még nem tárolt darabokat írja ki, így a változatlan
+    hónapok (CSV-ben hónaponkénti darabok, a mappás tárolóknál változatlan
+    partíció- és szegmensfájlok) egyszer foglalnak helyet. A megőrzési szabály
+    forrásonként és okonként (lásd Snapshot.reason) a legutóbbi mentést, valamint
+    a legutóbbi keep_daily nap és keep_monthly hónap utolsó mentését tartja meg,
+    így tárolóváltás vagy visszaállítás után a másik csoport mentései nem szorulnak
+    ki; a már egyetlen mentés által sem hivatkozott darabok törlődnek.
+    """
+
+    def __init__(self, backup_dir: Path, keep_daily: int = KEEP_DAILY, keep_monthly: int = KEEP_MONTHLY) -> None:
+        self.backup_dir = backup_dir
+        self.objects_dir = backup_dir / "objects"
+        self.snapshots_dir = backup_dir / "snapshots"
+        self.keep_daily = keep_daily
+        self.keep_monthly = keep_monthly
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.gz"
+
+    def _put(self, data: bytes) -> tuple[str, bool]:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(gzip.compress(data, compresslevel=6))
+        os.replace(tmp_path, path)
+        return digest, True
+
+    def _put_file(self, path: Path, counts: list[int]) -> tuple[list[str], int, str]:
+        """Egy fájl darabjainak tárolása; (darabok, méret, lenyomat), a counts az új darabokat/bájtokat gyűjti."""
+        whole = hashlib.sha256()
+        chunks, size = [], 0
+        for data in iter_file_chunks(path):
+            whole.update(data)
+            size += len(data)
+            digest, created = self._put(data)
+            chunks.append(digest)
+            if created:
+                counts[0] += 1
+                counts[1] += len(data)
+        return chunks, size, whole.hexdigest()
+
+    def _previous_files(self, source: str) -> dict[str, dict]:
+        """
+        A forrás legutóbbi mappás mentésének fájljai relatív út szerint.
+
+        Az azonos méretű és mtime-ú fájl darablistája onnan átvehető, így a
+        változatlan partíciók és szegmensek újraolvasás nélkül kerülnek a
+        mentésbe (a darabjaik az előző mentésből már megvannak).
+        """
+        previous = [s for s in self.list_snapshots() if s.source == source and s.files]
+        return {entry["path"]: entry for entry in previous[-1].files} if previous else {}
+
+    def snapshot(self, path: Path, retention: bool = True, ingested: dict[str, str] | None = None, reason: str = "write") -> Snapshot | None:
+        """Elmenti a fájl vagy a tároló-mappa aktuális állapotát; üres vagy hiányzó forrásnál None."""
+        counts = [0, 0]
+        if path.is_dir():
+            files = []
+            previous = self._previous_files(path.name)
+            scan_ns = time.time_ns()
+            for file_path in sorted(p for p in path.rglob("*") if p.is_file() and not p.name.endswith(".tmp")):
+                relative, stat = file_path.relative_to(path).as_posix(), file_path.stat()
+                entry = previous.get(relative)
+                if entry is None or entry["size"] != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+                    file_chunks, file_size, file_sha = self._put_file(file_path, counts)
+                    mtime_ns = stat.st_mtime_ns if scan_ns - stat.st_mtime_ns > RACY_MTIME_NS else None
+                    entry = {"path": relative, "size": file_size, "mtime_ns": mtime_ns, "sha256": file_sha, "chunks": file_chunks}
+                files.append(entry)
+            if not files:
+                return None
+            chunks, size, sha256 = [], sum(entry["size"] for entry in files), directory_digest(files)
+        else:
+            if not path.exists() or path.stat().st_size == 0:
+                return None
+            files = []
+            chunks, size, sha256 = self._put_file(path, counts)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        now = pd.Timestamp.now()
+        label = path.stem if path.suffix == ".csv" else path.name.replace(".", "_")
+        snapshot_id = self._unique_id(f"{label}_{now.strftime('%Y%m%d_%H%M%S')}")
+        snapshot = Snapshot(snapshot_id, now.isoformat(timespec="seconds"), path.name, size, sha256, chunks, files, ingested, reason)
+        tmp_path = self.snapshots_dir / f"{snapshot_id}.json.tmp"
+        tmp_path.write_text(json.dumps(asdict(snapshot), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.snapshots_dir / f"{snapshot_id}.json")
+        logging.info(f"💾 Biztonsági mentés: '{snapshot_id}' ({len(snapshot.digests())} darab, ebből új: {counts[0]}, {counts[1]} bájt).")
+        if retention:
+            self.apply_retention()
+        return snapshot
+
+    def _unique_id(self, base: str) -> str:
+        candidate, n = base, 1
+        while (self.snapshots_dir / f"{candidate}.json").exists():
+            candidate, n = f"{base}_{n}", n + 1
+        return candidate
+
+    def list_snapshots(self) -> list[Snapshot]:
+        """A mentések időrendben (legrégebbi elöl)."""
+        if not self.snapshots_dir.exists():
+            return []
+        snapshots = []
+        for path in self.snapshots_dir.glob("*.json"):
+            try:
+                snapshots.append(Snapshot(**json.loads(path.read_text(encoding="utf-8"))))
+            except Exception as e:
+                logging.warning(f"⚠️ Sérült mentés-leíró kihagyva: {path.name} ({e})")
+        return sorted(snapshots, key=lambda s: (s.created, s.id))
+
+    def resolve(self, snapshot_id: str) -> Snapshot | None:
+        """Mentés keresése azonosító alapján; 'latest' = a legutóbbi."""
+        snapshots = self.list_snapshots()
+        if snapshot_id == "latest":
+            return snapshots[-1] if snapshots else None
+        return next((s for s in snapshots if s.id == snapshot_id), None)
+
+    def _write_chunks(self, chunks: list[str], out_path: Path, sha256: str) -> None:
+        whole = hashlib.sha256()
+        with open(out_path, "wb") as out:
+            for digest in chunks:
+                data = gzip.decompress(self._object_path(digest).read_bytes())
+                whole.update(data)
+                out.write(data)
+        if whole.hexdigest() != sha256:
+            raise ValueError(f"a visszaállított tartalom lenyomata eltér ({out_path.name})")
+
+    def restore(self, snapshot: Snapshot, target: Path) -> bool:
+        """
+        Egy mentés visszaállítása a célfájlba vagy -mappába (ellenőrzött hash, ideiglenes példány + csere).
+
+        Mappánál az ideiglenes mappa teljes felépítése után a régi mappa
+        félrekerül, az új a helyére lép, majd a régi törlődik.
+        """
+        snapshot_id = snapshot.id
+        tmp_path = target.with_name(target.name + ".restore.tmp")
+        try:
+            if snapshot.files:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                for entry in snapshot.files:
+                    out_path = tmp_path / entry["path"]
+                    out_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._write_chunks(entry["chunks"], out_path, entry["sha256"])
+                old_path = target.with_name(target.name + ".restore.old")
+                shutil.rmtree(old_path, ignore_errors=True)
+                if target.exists():
+                    os.replace(target, old_path)
+                os.replace(tmp_path, target)
+                shutil.rmtree(old_path, ignore_errors=True)
+            else:
+                self._write_chunks(snapshot.chunks, tmp_path, snapshot.sha256)
+                os.replace(tmp_path, target)
+        except Exception as e:
+            if tmp_path.is_dir():
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            else:
+                tmp_path.unlink(missing_ok=True)
+            logging.error(f"❌ A visszaállítás sikertelen ('{snapshot_id}'): {e}")
+            return False
+        logging.info(f"♻️ Visszaállítva: '{snapshot_id}' → {target} ({snapshot.size} bájt).")
+        return True
+
+    def apply_retention(self) -> list[str]:
+        """A megőrzési szabályon kívül eső mentések és a hivatkozatlan darabok törlése."""
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            return []
+        groups: dict[tuple[str, str], list[Snapshot]] = {}
+        for snapshot in snapshots:
+            groups.setdefault((snapshot.source, snapshot.reason), []).append(snapshot)
+        keep = set()
+        for group in groups.values():
+            keep.add(group[-1].id)  # csoportonként a legutóbbi mentés mindig megmarad
+            for period_len, limit in ((10, self.keep_daily), (7, self.keep_monthly)):
+                latest_per_period: dict[str, Snapshot] = {}
+                for snapshot in group:
+                    latest_per_period[snapshot.created[:period_len]] = snapshot
+                for period in sorted(latest_per_period, reverse=True)[:limit]:
+                    keep.add(latest_per_period[period].id)
+        removed = [s.id for s in snapshots if s.id not in keep]
+        for snapshot_id in removed:
+            (self.snapshots_dir / f"{snapshot_id}.json").unlink(missing_ok=True)
+        if removed:
+            referenced = {digest for s in snapshots if s.id in keep for digest in s.digests()}
+            freed = 0
+            for path in self.objects_dir.glob("*/*.gz"):
+                if path.name[:-3] not in referenced:
+                    freed += path.stat().st_size
+                    path.unlink()
+            logging.info(f"🧹 Megőrzési szabály: {len(removed)} régi mentés törölve, {freed} bájt felszabadítva.")
+        return removed
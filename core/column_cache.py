@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# MEMÓRIÁBA LEKÉPEZETT NUMPY OSZLOPOK A GYORS GUI INDULÁSHOZ
+
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from meter_registry import METER_DTYPE
+
+COLUMNS_DIRNAME = "columns"
+TS_FILENAME = "ts.npy"
+KWH_FILENAME = "kwh.npy"
+METER_FILENAME = "meter.npy"
+HEADER_FILENAME = "header.json"
+RAW_TS_DTYPE = np.dtype("<i8")     # epoch nanoszekundum (faliórás idő), így nézetként datetime64[ns]
+MINUTE_TS_DTYPE = np.dtype("<i4")  # perc az epoch óta (±4000 év)
+WH_DTYPE = np.dtype("<i4")         # wattóra (0,001 kWh): a 3 tizedes exportoknál pontos
+RAW_KWH_DTYPE = np.dtype("<f8")    # nem egész wattórás értékeknél marad a kWh float64
+WH_PER_KWH = 1000
+NS_PER_MINUTE = 60 * 10**9
+COPY_ROWS = 1 << 20                # a végleges oszlopok ennyi soronként konvertálódnak
+
+
+def compact_ts_dtype(all_minutes: bool, ts_min: int | None, ts_max: int | None) -> tuple[np.dtype, str]:
+    """
+    Az időoszlop tárolási típusa és egysége.
+
+    Egész perces időpontoknál int32 perc az epoch óta (4 bájt); másodperces
+    vagy finomabb adatnál marad az int64 nanoszekundum.
+    """
+    info = np.iinfo(MINUTE_TS_DTYPE)
+    if all_minutes and (ts_min is None or info.min <= ts_min // NS_PER_MINUTE and ts_max // NS_PER_MINUTE <= info.max):
+        return MINUTE_TS_DTYPE, "min"
+    return RAW_TS_DTYPE, "ns"
+
+
+def is_whole_wh(kwh: np.ndarray) -> bool:
+    """Igaz, ha minden érték egész wattóra, és a wattórából visszaosztva bitre ugyanazt a float64-et adja."""
+    wh = np.rint(kwh * WH_PER_KWH)
+    return bool((wh / WH_PER_KWH == kwh).all() and (np.abs(wh) <= np.iinfo(WH_DTYPE).max).all())
+
+
+def compact_kwh_dtype(all_wh: bool) -> tuple[np.dtype, str]:
+    """
+    A kWh oszlop tárolási típusa és egysége.
+
+    Egész wattórás értékeknél int32 wattóra (4 bájt, kerekítési hiba nélkül,
+    az összegek egészként pontosak); egyébként float64 kWh.
+    """
+    return (WH_DTYPE, "Wh") if all_wh else (RAW_KWH_DTYPE, "kWh")
+
+
+def to_wh(kwh: np.ndarray) -> np.ndarray:
+    return np.rint(np.asarray(kwh, dtype="float64") * WH_PER_KWH).astype(WH_DTYPE)
+
+
+def compact_meter_dtype(max_code: int) -> np.dtype:
+    """A legkisebb előjel nélküli egész, amelyben a mérőkódok elférnek."""
+    for dtype in (np.uint8, np.uint16):
+        if max_code <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(METER_DTYPE)
+
+
+@dataclass
+class CompactColumns:
+    """
+    Az adatkészlet tömör oszlopos alakja: időpont (perc vagy ns), kWh (wattóra vagy float64), kis egész mérőkód.
+
+    A mérőkód a mérő-szótár kategóriáinak indexe (mint egy pandas Categorical
+    kódjai), így soronként 1-2 bájt; index nincs. A lekérdezés csak a
+    kiválasztott szeletet bontja ki a szokásos datetime64/float64 oszlopokká;
+    a kwh oszlop kwh_unit egységű, kWh-ra a to_kwh vált.
+    """
+
+    ts: np.ndarray
+    kwh: np.ndarray
+    meter: np.ndarray
+    ts_unit: str
+    kwh_unit: str
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CompactColumns":
+        """Időrendbe rendezett adatkeretből (pl. a CSV tároló teljes tartalmából)."""
+        ns = df['Kezdo_datum'].to_numpy(dtype="datetime64[ns]").view(RAW_TS_DTYPE)
+        codes = df['Mero_kod'].to_numpy()
+        kwh = df['Hatasos_ertek_kWh'].to_numpy(dtype="float64")
+        kwh_dtype, kwh_unit = compact_kwh_dtype(is_whole_wh(kwh))
+        ts_dtype, ts_unit = compact_ts_dtype(
+            bool((ns % NS_PER_MINUTE == 0).all()),
+            int(ns.min()) if len(ns) else None,
+            int(ns.max()) if len(ns) else None,
+        )
+        return cls(
+            ts=(ns // NS_PER_MINUTE if ts_unit == "min" else ns).astype(ts_dtype),
+            kwh=to_wh(kwh) if kwh_unit == "Wh" else kwh,
+            meter=codes.astype(compact_meter_dtype(int(codes.max()) if len(codes) else 0)),
+            ts_unit=ts_unit,
+            kwh_unit=kwh_unit,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.kwh.nbytes + self.meter.nbytes
+
+    @property
+    def bytes_per_row(self) -> int:
+        return self.ts.dtype.itemsize + self.kwh.dtype.itemsize + self.meter.dtype.itemsize
+
+    def to_kwh(self, kwh) -> np.ndarray:
+        """A kwh oszlop (szeletének vagy összegének) értéke float64 kWh-ban."""
+        kwh = np.asarray(kwh, dtype="float64")
+        return kwh / WH_PER_KWH if self.kwh_unit == "Wh" else kwh
+
+    def ts_key(self, value, upper: bool) -> int:
+        """Időpont a ts oszlop egységében; perceknél az alsó határ felfelé, a felső lefelé kerekül."""
+        ns = pd.Timestamp(value).value
+        if self.ts_unit != "min":
+            return ns
+        minutes = ns // NS_PER_MINUTE if upper else -(-ns // NS_PER_MINUTE)
+        info = np.iinfo(self.ts.dtype)
+        return min(max(minutes, info.min), info.max)
+
+    def to_ns(self, ts: np.ndarray) -> np.ndarray:
+        ts = np.asarray(ts, dtype=RAW_TS_DTYPE)
+        return ts * NS_PER_MINUTE if self.ts_unit == "min" else ts
+
+    def ts_ns(self, lo: int = 0, hi: int | None = None) -> np.ndarray:
+        """A [lo, hi) sorok időpontja epoch nanoszekundumban (a tárolási egységtől függetlenül)."""
+        return self.to_ns(self.ts[lo:hi])
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        if not len(self):
+            return None
+        first, last = self.to_ns(self.ts[[0, -1]])
+        return pd.Timestamp(int(first)), pd.Timestamp(int(last))
+
+    def read_range(self, start=None, end=None) -> pd.DataFrame:
+        """A [start, end] szelet; csak a kiválasztott sorok bomlanak ki (a kWh float64-re)."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, self.ts_key(start, upper=False), side="left"))
+        hi = len(self.ts) if end is None else int(np.searchsorted(self.ts, self.ts_key(end, upper=True), side="right"))
+        return pd.DataFrame({
+            'Kezdo_datum': self.to_ns(self.ts[lo:hi]).view("datetime64[ns]"),
+            'Mero_kod': np.asarray(self.meter[lo:hi], dtype=METER_DTYPE),
+            'Hatasos_ertek_kWh': self.to_kwh(self.kwh[lo:hi]),
+        })
+
+
+class ColumnCache:
+    """
+    A tisztított adatkészlet nyers .npy oszlopai és egy kis JSON fejléc.
+
+    Az olvasó mmap_mode='r'-rel nyitja az oszlopokat, így a megnyitás
+    költsége független az adatkészlet méretétől, a lapokat pedig az OS
+    gyorsítótára osztja meg a folyamatok között. Az időszak kiválasztása
+    bináris kereséssel történik, csak a kért szelet kerül a memóriába.
+    Az oszlopok a CompactColumns tömör típusait használják.
+    """
+
+    VERSION = 4  # 4: wattórás kWh oszlop
+
+    def __init__(self, output_dir: Path) -> None:
+        self.root = output_dir / COLUMNS_DIRNAME
+        self.header: dict | None = None
+        self.data: CompactColumns | None = None
+
+    def build(self, frames, dataset_version: int, store_name: str) -> int:
+        """
+        Kiírja az oszlopokat az időrendben érkező darabokból, korlátos memóriával.
+
+        Az első menet a nyers bájtokat ideiglenes fájlokba fűzi, megszámolja a
+        sorokat és eldönti a tömör típusokat; utána a .npy fejléc és a
+        konvertált adatok kerülnek a végleges helyre.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        rows, ts_min, ts_max, max_code, all_minutes, all_wh = 0, None, None, 0, True, True
+        with tempfile.TemporaryDirectory(prefix="columns_", dir=self.root) as tmp_root:
+            raw_ts, raw_kwh, raw_meter = (Path(tmp_root) / name for name in ("ts.raw", "kwh.raw", "meter.raw"))
+            with open(raw_ts, "wb") as ts_fh, open(raw_kwh, "wb") as kwh_fh, open(raw_meter, "wb") as meter_fh:
+                for df in frames:
+                    if df.empty:
+                        continue
+                    ts = df['Kezdo_datum'].to_numpy(dtype="datetime64[ns]").view(RAW_TS_DTYPE)
+                    codes = df['Mero_kod'].to_numpy(dtype=METER_DTYPE)
+                    kwh = df['Hatasos_ertek_kWh'].to_numpy(dtype=RAW_KWH_DTYPE)
+                    ts_fh.write(ts.tobytes())
+                    kwh_fh.write(kwh.tobytes())
+                    meter_fh.write(codes.tobytes())
+                    rows += len(ts)
+                    ts_min = int(ts[0]) if ts_min is None else ts_min
+                    ts_max = int(ts[-1])
+                    max_code = max(max_code, int(codes.max()))
+                    all_minutes = all_minutes and bool((ts % NS_PER_MINUTE == 0).all())
+                    all_wh = all_wh and is_whole_wh(kwh)
+            ts_dtype, ts_unit = compact_ts_dtype(all_minutes, ts_min, ts_max)
+            kwh_dtype, kwh_unit = compact_kwh_dtype(all_wh)
+            meter_dtype = compact_meter_dtype(max_code)
+            self._finalize(raw_ts, TS_FILENAME, RAW_TS_DTYPE, ts_dtype, rows, tmp_root, (lambda b: b // NS_PER_MINUTE) if ts_unit == "min" else None)
+            self._finalize(raw_kwh, KWH_FILENAME, RAW_KWH_DTYPE, kwh_dtype, rows, tmp_root, to_wh if kwh_unit == "Wh" else None)
+            self._finalize(raw_meter, METER_FILENAME, METER_DTYPE, meter_dtype, rows, tmp_root)
+        header = {
+            "version": self.VERSION,
+            "rows": rows,
+            "ts_unit": ts_unit,
+            "ts_min": None if ts_min is None else str(pd.Timestamp(ts_min)),
+            "ts_max": None if ts_max is None else str(pd.Timestamp(ts_max)),
+            "ts_dtype": ts_dtype.str,
+            "kwh_unit": kwh_unit,
+            "kwh_dtype": kwh_dtype.str,
+            "meter_dtype": meter_dtype.str,
+            "bytes_per_row": ts_dtype.itemsize + kwh_dtype.itemsize + meter_dtype.itemsize,
+            "dataset_version": dataset_version,
+            "store": store_name,
+        }
+        tmp_header = self.root / (HEADER_FILENAME + ".tmp")
+        tmp_header.write_text(json.dumps(header, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_header, self.root / HEADER_FILENAME)
+        self.header = header
+        return rows
+
+    def _finalize(self, raw_path: Path, filename: str, raw_dtype: np.dtype, dtype: np.dtype, rows: int, tmp_root: str, convert=None) -> None:
+        tmp_path = Path(tmp_root) / filename
+        with open(tmp_path, "wb") as out, open(raw_path, "rb") as raw:
+            np.lib.format.write_array_header_1_0(out, {"descr": dtype.str, "fortran_order": False, "shape": (rows,)})
+            while len(block := np.fromfile(raw, dtype=raw_dtype, count=COPY_ROWS)):
+                out.write((block if convert is None else convert(block)).astype(dtype).tobytes())
+        os.replace(tmp_path, self.root / filename)
+
+    def open(self, dataset_version: int | None = None) -> bool:
+        """Megnyitja az oszlopokat; hamis, ha hiányoznak vagy nem az aktuális adatkészlethez tartoznak."""
+        self.header = self.data = None
+        header_path = self.root / HEADER_FILENAME
+        if not header_path.exists():
+            return False
+        try:
+            header = json.loads(header_path.read_text(encoding="utf-8"))
+            if header.get("version") != self.VERSION:
+                return False
+            if dataset_version is not None and header.get("dataset_version") != dataset_version:
+                return False
+            ts = np.load(self.root / TS_FILENAME, mmap_mode="r")
+            kwh = np.load(self.root / KWH_FILENAME, mmap_mode="r")
+            meter = np.load(self.root / METER_FILENAME, mmap_mode="r")
+        except Exception as e:
+            logging.warning(f"⚠️ Az oszlop-gyorsítótár nem nyitható meg ({e}): {self.root}")
+            return False
+        if not len(ts) == len(kwh) == len(meter) == header["rows"]:
+            return False
+        self.header, self.data = header, CompactColumns(ts, kwh, meter, header["ts_unit"], header["kwh_unit"])
+        return True
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        if self.header is None or not self.header["rows"]:
+            return None
+        return pd.Timestamp(self.header["ts_min"]), pd.Timestamp(self.header["ts_max"])
+
+    def read_range(self, start=None, end=None) -> pd.DataFrame:
+        """A [start, end] szelet; csak a kiválasztott sorok másolódnak (a kWh float64-re)."""
+        return self.data.read_range(start, end)
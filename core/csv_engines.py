@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# CSV BEOLVASÓ MOTOROK (PANDAS / PYARROW)
+
+import logging
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # opcionális függőség, nélküle a pandas motor fut
+    pa = None
+    pa_csv = None
+
+ENGINE_CHOICES = ["auto", "pandas", "pyarrow"]
+
+# Explicit típusok a beolvasáshoz. A kWh oszlop szándékosan hiányzik a pandas
+# motornál: a parser a felismert tizedesjellel (decimal=...) közvetlenül
+# float64-re olvassa, hibás érték esetén pedig object marad, amit a
+# clean_frame tartalék útja kezel.
+COLUMN_DTYPES = {
+    'Gyariszam': str,
+    'Azonosito': str,
+    'Kezdo_datum': str,
+    'Zaro_datum': str,
+}
+
+# Egy sor becsült mérete a pyarrow blokkméretéhez darabolt olvasásnál
+APPROX_ROW_BYTES = 128
+
+
+class PandasCsvEngine:
+    """A pandas C parserére épülő motor (mindig elérhető)."""
+
+    name = "pandas"
+
+    @staticmethod
+    def read_options(fmt, resolved: dict[str, str]) -> dict:
+        """A felismert formátumhoz tartozó read_csv paraméterek."""
+        return dict(
+            sep=fmt.delimiter,
+            encoding=fmt.encoding,
+            skiprows=fmt.header_row,
+            usecols=list(resolved),
+            dtype={col: COLUMN_DTYPES[name] for col, name in resolved.items() if name in COLUMN_DTYPES},
+            decimal=fmt.decimal,
+            on_bad_lines="warn",
+        )
+
+    def read(self, source, fmt, resolved: dict[str, str]) -> pd.DataFrame:
+        with source.readable() as target:
+            return pd.read_csv(target, **self.read_options(fmt, resolved))
+
+    def iter_chunks(self, source, fmt, resolved: dict[str, str], chunksize: int):
+        with source.readable() as target, pd.read_csv(target, chunksize=chunksize, **self.read_options(fmt, resolved)) as reader:
+            yield from reader
+
+
+class PyArrowCsvEngine:
+    """
+    A pyarrow többszálú CSV olvasójára épülő motor.
+
+    A kWh oszlop a felismert tizedesjellel float64-ként, a többi szövegként
+    érkezik, így a tisztítás után az eredmény megegyezik a pandas motoréval.
+    Bármely hibás sor (hibás kWh érték, hiányzó vagy fölös mező) esetén a
+    beolvasás kivételt dob, és a FileProcessor a pandas motorra vált; a két
+    motor saját hibás-sor kezelése így soha nem keveredik.
+    """
+
+    name = "pyarrow"
+
+    def __init__(self, arrow_dtypes: bool = False) -> None:
+        self.arrow_dtypes = arrow_dtypes
+
+    def _options(self, fmt, resolved: dict[str, str], block_size: int | None = None):
+        column_types = {col: (pa.float64() if name == 'Hatasos_ertek_kWh' else pa.string()) for col, name in resolved.items()}
+        read_options = pa_csv.ReadOptions(encoding=fmt.encoding, skip_rows=fmt.header_row, use_threads=True)
+        if block_size:
+            read_options.block_size = block_size
+        parse_options = pa_csv.ParseOptions(delimiter=fmt.delimiter)
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=list(resolved),
+            column_types=column_types,
+            decimal_point=fmt.decimal,
+            strings_can_be_null=True,
+        )
+        return read_options, parse_options, convert_options
+
+    def _to_pandas(self, table) -> pd.DataFrame:
+        if self.arrow_dtypes:
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return table.to_pandas()
+
+    def read(self, source, fmt, resolved: dict[str, str]) -> pd.DataFrame:
+        read_options, parse_options, convert_options = self._options(fmt, resolved)
+        with source.readable() as target:
+            table = pa_csv.read_csv(target, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        return self._to_pandas(table)
+
+    def iter_chunks(self, source, fmt, resolved: dict[str, str], chunksize: int):
+        block_size = max(1 << 20, chunksize * APPROX_ROW_BYTES)
+        read_options, parse_options, convert_options = self._options(fmt, resolved, block_size)
+        with source.readable() as target:
+            reader = pa_csv.open_csv(target, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+            for batch in reader:
+                yield self._to_pandas(pa.Table.from_batches([batch]))
+
+
+def iter_chunks_with_fallback(engines: list, source, fmt, resolved: dict[str, str], chunksize: int):
+    """
+    Darabolt olvasás motor-tartalékkal: ha egy motor menet közben kivételt dob, a következő folytatja.
+
+    A már továbbadott sorokat a következő motor átlépi. A pyarrow az első
+    hibás sort tartalmazó blokknál áll meg, így az addig kiadott sorok a fájl
+    hibátlan eleje, amelyet a pandas motor ugyanígy olvas.
+    """
+    done = 0
+    for i, engine in enumerate(engines):
+        seen = 0
+        try:
+            for chunk in engine.iter_chunks(source, fmt, resolved, chunksize):
+                start, seen = seen, seen + len(chunk)
+                if seen <= done:
+                    continue
+                yield chunk.iloc[max(done - start, 0):]
+                done = seen
+            return
+        except Exception as e:
+            if i == len(engines) - 1:
+                raise
+            logging.warning(f"⚠️ '{source.name}': a(z) {engine.name} motor hibát jelzett ({e}), {done} sor után a(z) {engines[i + 1].name} motor folytatja.")
+
+
+def create_engine(name: str = "auto", arrow_dtypes: bool = False):
+    """Motor kiválasztása; 'auto' esetén a pyarrow, ha telepítve van."""
+    if name not in ENGINE_CHOICES:
+        raise ValueError(f"Ismeretlen CSV motor: {name} (választható: {ENGINE_CHOICES})")
+    if name == "pandas":
+        return PandasCsvEngine()
+    if pa_csv is None:
+        if name == "pyarrow":
+            logging.warning("⚠️ A pyarrow nincs telepítve, a pandas motor fut.")
+        return PandasCsvEngine()
+    return PyArrowCsvEngine(arrow_dtypes=arrow_dtypes)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# TISZTÍTOTT ADATKÉSZLET TÁROLÓK (CSV / PARTICIONÁLT PARQUET)
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from duplicate_handler import merge_with_existing
+from ingest_manifest import IngestManifest
+from meter_registry import METER_DTYPE, MeterRegistry
+from segment_store import SegmentStore
+from sqlite_store import SqliteStore
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # opcionális függőség, nélküle csak a CSV tároló érhető el
+    pq = None
+
+STORE_CHOICES = ["auto", "csv", "parquet", "sqlite", "segments"]
+METER_COLUMN = 'Mero_kod'
+OUTPUT_COLUMNS = ['Kezdo_datum', METER_COLUMN, 'Hatasos_ertek_kWh']
+SORT_COLUMNS = ['Kezdo_datum', METER_COLUMN]
+CSV_DTYPES = {METER_COLUMN: METER_DTYPE}
+OUTPUT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+CSV_FILENAME = "energia_adatok_tisztitott.csv"
+PARQUET_DIRNAME = "energia_adatok.parquet"
+
+
+def month_key(ts: pd.Timestamp) -> str:
+    """A partíció kulcsa: 'ÉÉÉÉ-HH'."""
+    return f"{ts.year:04d}-{ts.month:02d}"
+
+
+def output_frame(df: pd.DataFrame, meters: MeterRegistry) -> pd.DataFrame:
+    """A tisztított sorok a tárolók oszlopaival: a mérőazonosító helyett annak kódja."""
+    return df.assign(**{METER_COLUMN: meters.encode(df)})[OUTPUT_COLUMNS]
+
+
+class CsvStore:
+    """Az eredeti egyfájlos kimenet: minden mentés a teljes fájlt újraírja."""
+
+    name = "csv"
+    pushdown = False
+
+    def __init__(self, output_dir: Path, fp=None) -> None:
+        self.path = output_dir / CSV_FILENAME
+        self.fp = fp  # mentéshez (biztonsági mentés + atomikus csere); olvasáshoz nem kell
+
+    @property
+    def location(self) -> Path:
+        return self.path
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def read(self, start=None, end=None) -> pd.DataFrame | None:
+        """A teljes fájl beolvasása; időszak megadásakor utólagos szűréssel."""
+        if not self.exists():
+            return None
+        df = pd.read_csv(self.path, sep=";", parse_dates=["Kezdo_datum"], dtype=CSV_DTYPES)
+        if start is not None or end is not None:
+            lo = pd.Timestamp.min if start is None else pd.Timestamp(start)
+            hi = pd.Timestamp.max if end is None else pd.Timestamp(end)
+            df = df[(df['Kezdo_datum'] >= lo) & (df['Kezdo_datum'] <= hi)].reset_index(drop=True)
+        return df
+
+    def backup(self, reason: str = "write") -> None:
+        """Biztonsági mentés a fájl felülírása előtt (a változatlan hónapok darabjai újra felhasználódnak)."""
+        self.fp.backup_file(self.path, reason)
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        df = self.read()
+        if df is None or df.empty:
+            return None
+        return df['Kezdo_datum'].min(), df['Kezdo_datum'].max()
+
+    def write(self, df: pd.DataFrame) -> bool:
+        """A teljes adatkészlet mentése a FileProcessor-on át (biztonsági mentés, ideiglenes fájl + csere)."""
+        return self.fp.save_csv_file(df, self.path)
+
+    def merge(self, new_df: pd.DataFrame) -> bool:
+        """Új adatok hozzáfűzése: a teljes fájl beolvasása, összefésülése és újraírása."""
+        existing_df = self.read()
+        merged = merge_with_existing(existing_df, new_df).sort_values(by=SORT_COLUMNS).reset_index(drop=True)
+        logging.info(f"Meglévő adatkészlethez fűzve: {len(existing_df)} → {len(merged)} sor.")
+        return self.write(merged)
+
+    def iter_frames(self, chunksize: int = 100_000):
+        """A teljes adatkészlet időrendben, darabonként."""
+        with pd.read_csv(self.path, sep=";", parse_dates=["Kezdo_datum"], dtype=CSV_DTYPES, chunksize=chunksize) as reader:
+            yield from reader
+
+    def existing_chunks(self, months: set[str], chunksize: int):
+        """Darabolt módhoz a meglévő adatok; a CSV csak egészben írható újra, ezért minden hónap kell."""
+        return self.iter_frames(chunksize)
+
+    @contextmanager
+    def month_writer(self, replace: bool):
+        """Hónaponkénti kiírás egy ideiglenes fájlba, a végén mentés és atomikus csere."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        state = {"first": True}
+
+        def write_month(month_df: pd.DataFrame) -> None:
+            month_df.to_csv(
+                tmp_path,
+                sep=";",
+                index=False,
+                mode="w" if state["first"] else "a",
+                header=state["first"],
+                encoding="utf-8-sig" if state["first"] else "utf-8",
+                date_format=OUTPUT_DATE_FORMAT,
+            )
+            state["first"] = False
+
+        yield write_month
+        if not state["first"]:
+            self.backup()
+            os.replace(tmp_path, self.path)
+
+
+class ParquetStore:
+    """
+    Év/hónap szerint particionált Parquet tároló.
+
+    Minden hónap külön fájl (year=ÉÉÉÉ/month=HH/data.parquet), típusos
+    oszlopokkal. A _partitions.json partíciónként a sorszámot és a dátum,
+    illetve kWh min/max értékét tartja nyilván, így az olvasó a kért
+    időszakkal át nem fedő partíciókat meg sem nyitja, az írás pedig csak az
+    érintett hónapokat cseréli.
+    """
+
+    name = "parquet"
+    pushdown = False
+    VERSION = 1
+
+    def __init__(self, output_dir: Path, fp=None) -> None:
+        self.root = output_dir / PARQUET_DIRNAME
+        self.stats_path = self.root / "_partitions.json"
+        self.fp = fp  # írás előtti biztonsági mentéshez; olvasáshoz nem kell
+        self.partitions: dict[str, dict] = {}
+        self.load_stats()
+
+    @property
+    def location(self) -> Path:
+        return self.root
+
+    @staticmethod
+    def available() -> bool:
+        return pq is not None
+
+    def exists(self) -> bool:
+        return self.stats_path.exists()
+
+    def load_stats(self) -> None:
+        if not self.exists():
+            return
+        try:
+            raw = json.loads(self.stats_path.read_text(encoding="utf-8"))
+            if raw.get("version") == self.VERSION:
+                self.partitions = {p["key"]: p for p in raw.get("partitions", [])}
+        except Exception as e:
+            logging.warning(f"⚠️ A partíció-statisztika nem olvasható ({e}): {self.stats_path}")
+            self.partitions = {}
+
+    def save_stats(self) -> None:
+        payload = {"version": self.VERSION, "partitions": [self.partitions[key] for key in sorted(self.partitions)]}
+        tmp_path = self.stats_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.stats_path)
+
+    def _partition_path(self, key: str) -> Path:
+        year, month = key.split("-")
+        return self.root / f"year={year}" / f"month={month}" / "data.parquet"
+
+    def overlapping(self, start=None, end=None) -> list[str]:
+        """A [start, end] időszakkal átfedő partíciók kulcsai, időrendben."""
+        keys = []
+        for key in sorted(self.partitions):
+            part = self.partitions[key]
+            if start is not None and pd.Timestamp(part["date_max"]) < pd.Timestamp(start):
+                continue
+            if end is not None and pd.Timestamp(part["date_min"]) > pd.Timestamp(end):
+                continue
+            keys.append(key)
+        return keys
+
+    def read_partition(self, key: str) -> pd.DataFrame | None:
+        if key not in self.partitions:
+            return None
+        return pd.read_parquet(self._partition_path(key))
+
+    def read(self, start=None, end=None) -> pd.DataFrame | None:
+        """Csak az átfedő partíciók beolvasása; a határ-partíciók sorait a pyarrow szűri."""
+        if not self.exists():
+            return None
+        filters = []
+        if start is not None:
+            filters.append(("Kezdo_datum", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("Kezdo_datum", "<=", pd.Timestamp(end)))
+        frames = [pd.read_parquet(self._partition_path(key), filters=filters or None) for key in self.overlapping(start, end)]
+        if not frames:
+            return pd.DataFrame({
+                'Kezdo_datum': pd.Series(dtype="datetime64[ns]"),
+                METER_COLUMN: pd.Series(dtype=METER_DTYPE),
+                'Hatasos_ertek_kWh': pd.Series(dtype="float64"),
+            })
+        return pd.concat(frames, ignore_index=True)
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        """A teljes adatkészlet időszaka a statisztikából, adatolvasás nélkül."""
+        if not self.partitions:
+            return None
+        return (
+            min(pd.Timestamp(p["date_min"]) for p in self.partitions.values()),
+            max(pd.Timestamp(p["date_max"]) for p in self.partitions.values()),
+        )
+
+    def backup(self, reason: str = "write") -> None:
+        """A partíciók mentése írás előtt; a változatlan hónapok fájljai nem foglalnak új helyet."""
+        if self.fp is not None:
+            self.fp.backup_file(self.root, reason)
+
+    def write_partition(self, key: str, month_df: pd.DataFrame) -> None:
+        """Egy hónap atomikus cseréje és statisztikájának frissítése (a mentés a hívó dolga)."""
+        path = self._partition_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        month_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.partitions[key] = {
+            "key": key,
+            "path": str(path.relative_to(self.root)),
+            "rows": len(month_df),
+            "date_min": str(month_df['Kezdo_datum'].min()),
+            "date_max": str(month_df['Kezdo_datum'].max()),
+            "kwh_min": float(month_df['Hatasos_ertek_kWh'].min()),
+            "kwh_max": float(month_df['Hatasos_ertek_kWh'].max()),
+        }
+
+    def drop_partitions(self, keep: set[str]) -> None:
+        for key in sorted(set(self.partitions) - keep):
+            path = self._partition_path(key)
+            path.unlink(missing_ok=True)
+            for directory in (path.parent, path.parent.parent):
+                if directory.exists() and not any(directory.iterdir()):
+                    directory.rmdir()
+            del self.partitions[key]
+
+    def write(self, df: pd.DataFrame) -> bool:
+        """A teljes adatkészlet kiírása; a már nem létező hónapok partíciói törlődnek."""
+        try:
+            self.backup()
+            self.root.mkdir(parents=True, exist_ok=True)
+            keys = set()
+            for period, month_df in df.groupby(df['Kezdo_datum'].dt.to_period('M'), sort=True):
+                key = str(period)
+                self.write_partition(key, month_df.reset_index(drop=True))
+                keys.add(key)
+            self.drop_partitions(keys)
+            self.save_stats()
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.root}' tárolónál: {e}")
+            return False
+
+    def merge(self, new_df: pd.DataFrame) -> bool:
+        """Új adatok hozzáfűzése: csak az új adatok által érintett hónapok íródnak újra."""
+        try:
+            self.backup()
+            touched = 0
+            for period, new_month in new_df.groupby(new_df['Kezdo_datum'].dt.to_period('M'), sort=True):
+                key = str(period)
+                existing = self.read_partition(key)
+                month_df = new_month if existing is None else merge_with_existing(existing, new_month)
+                self.write_partition(key, month_df.sort_values(by=SORT_COLUMNS).reset_index(drop=True))
+                touched += 1
+            self.save_stats()
+            logging.info(f"Meglévő adatkészlethez fűzve: {touched} hónap partíciója frissült ({len(self.partitions)} összesen).")
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.root}' tárolónál: {e}")
+            return False
+
+    def iter_frames(self, chunksize: int = 100_000):
+        """A teljes adatkészlet időrendben, partíciónként."""
+        for key in sorted(self.partitions):
+            yield self.read_partition(key)
+
+    def existing_chunks(self, months: set[str], chunksize: int):
+        """Darabolt módhoz csak az érintett hónapok meglévő adatai kellenek."""
+        for key in sorted(months & set(self.partitions)):
+            yield self.read_partition(key)
+
+    @contextmanager
+    def month_writer(self, replace: bool):
+        """Hónaponkénti kiírás; teljes újraépítésnél a ki nem írt hónapok törlődnek."""
+        self.backup()
+        self.root.mkdir(parents=True, exist_ok=True)
+        written = set()
+
+        def write_month(month_df: pd.DataFrame) -> None:
+            key = month_key(month_df['Kezdo_datum'].iloc[0])
+            self.write_partition(key, month_df)
+            written.add(key)
+
+        yield write_month
+        if replace and written:
+            self.drop_partitions(written)
+        self.save_stats()
+
+
+def migrate_csv(store, csv_path: Path) -> bool:
+    """Egyszeri átállás: a meglévő tisztított CSV átírása a megadott tárolóba."""
+    df = pd.read_csv(csv_path, sep=";", parse_dates=["Kezdo_datum"], dtype=CSV_DTYPES)
+    if METER_COLUMN not in df.columns:
+        logging.info(f"A(z) '{csv_path.name}' még mérőkód nélküli, nem írható át.")
+        return False
+    if not store.write(df):
+        return False
+    logging.info(f"🔁 Átállás {store.name} tárolóra: {len(df)} sor ('{csv_path.name}' → '{store.location.name}').")
+    return True
+
+
+def create_store(name: str, fp):
+    """Tároló kiválasztása; 'auto' esetén Parquet, ha a pyarrow telepítve van."""
+    if name not in STORE_CHOICES:
+        raise ValueError(f"Ismeretlen tároló: {name} (választható: {STORE_CHOICES})")
+    if name == "csv":
+        return CsvStore(fp.output_dir, fp)
+    if name == "sqlite":
+        return SqliteStore(fp.output_dir, fp)
+    if name == "segments":
+        return SegmentStore(fp.output_dir, fp=fp)
+    if pq is None:
+        if name == "parquet":
+            logging.warning("⚠️ A pyarrow nincs telepítve, a CSV tároló marad.")
+        return CsvStore(fp.output_dir, fp)
+    return ParquetStore(fp.output_dir, fp)
+
+
+def store_for_backup(source: str, fp):
+    """A mentés forrásához (a tároló fájl- vagy mappanevéhez) tartozó tároló; None, ha nem ismert vagy nem elérhető."""
+    stores = [CsvStore(fp.output_dir, fp), SqliteStore(fp.output_dir, fp), SegmentStore(fp.output_dir, fp=fp)]
+    if pq is not None:
+        stores.append(ParquetStore(fp.output_dir, fp))
+    return next((store for store in stores if store.location.name == source), None)
+
+
+def open_existing_store(output_dir: Path):
+    """
+    Olvasáshoz a meglévő tároló.
+
+    Elsősorban az, amelyet a feldolgozó utoljára írt (a manifeszt szerint);
+    ha az nem található, a Parquet, végül a CSV.
+    """
+    candidates = {"csv": CsvStore(output_dir), "sqlite": SqliteStore(output_dir), "segments": SegmentStore(output_dir)}
+    if pq is not None:
+        candidates["parquet"] = ParquetStore(output_dir)
+    last_written = IngestManifest(output_dir / "ingest_manifest.json").store
+    if last_written in candidates and candidates[last_written].exists():
+        return candidates[last_written]
+    if "parquet" in candidates and candidates["parquet"].exists():
+        return candidates["parquet"]
+    return candidates["csv"]
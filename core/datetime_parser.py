@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# DÁTUMFORMÁTUM-FELISMERÉS GYORSÍTÓTÁRRAL
+
+import logging
+from dataclasses import dataclass
+
+import pandas as pd
+
+# A közmű exportokban előforduló formátumok, gyakoriság szerinti sorrendben
+CANDIDATE_FORMATS = [
+    "%Y.%m.%d. %H:%M",
+    "%Y.%m.%d. %H:%M:%S",
+    "%Y.%m.%d %H:%M",
+    "%Y.%m.%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%Y.%m.%d.",
+    "%Y-%m-%d",
+]
+
+
+@dataclass
+class DatetimeStats:
+    """Dátumértelmezési számlálók: explicit formátummal, tartalék úton, sikertelenül."""
+
+    parsed: int = 0
+    fallback: int = 0
+    failed: int = 0
+
+    def add(self, other: "DatetimeStats") -> None:
+        self.parsed += other.parsed
+        self.fallback += other.fallback
+        self.failed += other.failed
+
+    @property
+    def total(self) -> int:
+        return self.parsed + self.fallback + self.failed
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallback / self.total * 100 if self.total else 0.0
+
+
+class DatetimeParser:
+    """
+    Forrásonként egyszer, mintából felismert dátumformátum.
+
+    A felismert formátum a fejléc-aláírás (oszlopnevek + kódolás) és az
+    oszlop szerint gyorsítótárazódik, így az azonos szerkezetű exportok és
+    ugyanazon fájl darabjai már explicit formátummal értelmeződnek. Ami ezzel
+    nem értelmezhető, soronkénti tartalék úton megy és számlálódik.
+    """
+
+    def __init__(self, sample_size: int = 200, min_coverage: float = 0.9) -> None:
+        self.sample_size = sample_size
+        self.min_coverage = min_coverage
+        self.cache: dict[tuple, str | None] = {}
+        self.stats = DatetimeStats()
+
+    def detect_format(self, values: pd.Series) -> str | None:
+        """
+        A mintát legjobban lefedő jelölt formátum.
+
+        Néhány hibás sor a mintában nem ronthatja el a felismerést, ezért elég,
+        ha a formátum a minta legalább min_coverage részét értelmezi.
+        """
+        sample = values.dropna().head(self.sample_size)
+        if sample.empty:
+            return None
+        best_fmt, best_hits = None, 0
+        for fmt in CANDIDATE_FORMATS:
+            hits = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+            if hits == len(sample):
+                return fmt
+            if hits > best_hits:
+                best_fmt, best_hits = fmt, hits
+        return best_fmt if best_hits >= self.min_coverage * len(sample) else None
+
+    def parse(self, values: pd.Series, signature: tuple = ()) -> pd.Series:
+        """Egy dátumoszlop értelmezése a gyorsítótárazott formátummal és számolt tartalék úttal."""
+        key = (signature, values.name)
+        if key not in self.cache:
+            self.cache[key] = self.detect_format(values)
+            logging.debug(f"Dátumformátum felismerve ({values.name}): {self.cache[key]}")
+        fmt = self.cache[key]
+
+        present = values.notna()
+        if fmt is None:
+            parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+        else:
+            parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+        needs_fallback = parsed.isna() & present
+        if needs_fallback.any():
+            parsed[needs_fallback] = pd.to_datetime(values[needs_fallback], format="mixed", errors="coerce")
+
+        fallback_ok = int((needs_fallback & parsed.notna()).sum())
+        failed = int((needs_fallback & parsed.isna()).sum())
+        self.stats.add(DatetimeStats(int(present.sum()) - fallback_ok - failed, fallback_ok, failed))
+        return parsed
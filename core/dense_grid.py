@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# SŰRŰ, FIX LÉPÉSKÖZŰ 15 PERCES RÁCS JELENLÉTI BITTÉRKÉPPEL
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from column_cache import COPY_ROWS, WH_PER_KWH, CompactColumns
+
+GRID_DIRNAME = "grid"
+KWH_FILENAME = "kwh.npy"
+PRESENT_FILENAME = "present.npy"
+HEADER_FILENAME = "header.json"
+SLOT_MINUTES = 15
+SLOT_NS = SLOT_MINUTES * 60 * 10**9
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+# Ennél ritkább kitöltésnél (pl. évekre szétszórt mérők) a rács több helyet foglalna, mint a sorok
+MIN_DENSITY = 0.25
+
+# Intervallum → ennyi egymást követő rés alkot egy vödröt. A nap fix 96 rés
+# (faliórás idő), a hét és a hónap nem fix lépésközű, azok a rollup táblákból jönnek.
+GRID_BUCKET_SLOTS = {
+    "15min": 1,
+    "hourly": 60 // SLOT_MINUTES,
+    "daily": SLOTS_PER_DAY,
+}
+
+# Bájtonkénti egyes bitek száma (popcount) a bittérkép teljes bájtjaihoz
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class DenseGrid:
+    """
+    Mérőnként egy sűrű kWh tömb, indexe (időpont - origó) // 15 perc, és egy jelenléti bittérkép.
+
+    Az origó az első nap éjfele, a rés-szám egész napokra kerekített, így egy
+    időpont kiolvasása tömbindexelés, a hiányzó negyedórák száma a bittérkép
+    popcountja, az órás és napi vödör pedig reshape + sum (groupby nélkül).
+    Csak akkor készül, ha minden időpont a 15 perces rácsra esik; a hiányzó
+    rések kWh értéke 0, jelenlétük a bittérképből derül ki. A tömb az
+    oszlop-gyorsítótár egységét és típusát veszi át (wattóránál egész), a
+    vödör-összegek float64-ben, egységben összegződnek, és csak a végén
+    váltanak kWh-ra, így egyeznek a többi lekérdezési út eredményével.
+    """
+
+    VERSION = 2  # 2: a kWh tömb az oszlopok egységében (wattóra)
+
+    def __init__(self, output_dir: Path) -> None:
+        self.root = output_dir / GRID_DIRNAME
+        self.header: dict | None = None
+        self.kwh: np.ndarray | None = None
+        self.present: np.ndarray | None = None
+        self.origin = 0
+        self.kwh_scale = 1
+
+    def build(self, columns: CompactColumns, dataset_version: int, store_name: str) -> bool:
+        """
+        A rács felépítése az oszlop-gyorsítótár tömör oszlopaiból, COPY_ROWS soronként.
+
+        Hamis, ha az adat nem illeszkedik a rácsra (nem negyedórás időpont,
+        ismétlődő rés vagy túl ritka kitöltés); ekkor a fejléc az okot rögzíti,
+        a lekérdezések pedig a többi úton mennek.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        reason, rows = None, len(columns)
+        meters, origin, slots = 0, 0, 0
+        if not rows:
+            reason = "üres adatkészlet"
+        else:
+            bounds = columns.bounds()
+            origin = bounds[0].normalize().value
+            slots = -(-(bounds[1].value - origin + 1) // (SLOTS_PER_DAY * SLOT_NS)) * SLOTS_PER_DAY
+            for lo in range(0, rows, COPY_ROWS):
+                if (columns.ts_ns(lo, lo + COPY_ROWS) % SLOT_NS).any():
+                    reason = "nem negyedórás időpont"
+                    break
+                meters = max(meters, int(columns.meter[lo:lo + COPY_ROWS].max()) + 1)
+            if reason is None and rows < MIN_DENSITY * meters * slots:
+                reason = f"ritka kitöltés ({rows / (meters * slots):.0%})"
+        if reason is None:
+            reason = self._write(columns, origin, meters, slots)
+        header = {
+            "version": self.VERSION,
+            "applicable": reason is None,
+            "reason": reason,
+            "origin": str(pd.Timestamp(origin)),
+            "slot_minutes": SLOT_MINUTES,
+            "kwh_unit": columns.kwh_unit,
+            "meters": meters if reason is None else 0,
+            "slots": slots if reason is None else 0,
+            "rows": rows,
+            "dataset_version": dataset_version,
+            "store": store_name,
+        }
+        tmp_header = self.root / (HEADER_FILENAME + ".tmp")
+        tmp_header.write_text(json.dumps(header, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_header, self.root / HEADER_FILENAME)
+        self.header = header
+        return reason is None
+
+    def _write(self, columns: CompactColumns, origin: int, meters: int, slots: int) -> str | None:
+        """A kWh tömb közvetlenül memórialeképezett fájlba, a jelenlét bittérképpé tömörítve."""
+        tmp_kwh = self.root / (KWH_FILENAME + ".tmp")
+        kwh = np.lib.format.open_memmap(tmp_kwh, mode="w+", dtype=columns.kwh.dtype, shape=(meters, slots))
+        present = np.zeros((meters, slots), dtype=bool)
+        for lo in range(0, len(columns), COPY_ROWS):
+            slot = (columns.ts_ns(lo, lo + COPY_ROWS) - origin) // SLOT_NS
+            meter = np.asarray(columns.meter[lo:lo + COPY_ROWS], dtype=np.intp)
+            kwh[meter, slot] = columns.kwh[lo:lo + COPY_ROWS]
+            present[meter, slot] = True
+        kwh.flush()
+        del kwh
+        if int(present.sum()) != len(columns):
+            tmp_kwh.unlink()
+            return "ismétlődő negyedóra egy mérőn"
+        tmp_present = self.root / (PRESENT_FILENAME + ".tmp")
+        with open(tmp_present, "wb") as fh:
+            np.save(fh, np.packbits(present, axis=1))
+        os.replace(tmp_kwh, self.root / KWH_FILENAME)
+        os.replace(tmp_present, self.root / PRESENT_FILENAME)
+        return None
+
+    def open(self, dataset_version: int | None = None) -> bool:
+        """
+        Megnyitja a rácsot; hamis, ha hiányzik, elavult vagy az adatkészletre nem alkalmazható.
+
+        A nem alkalmazható rács fejléce ilyenkor is betöltődik (self.header), így
+        a hívó meg tudja különböztetni a hiányzó rácstól.
+        """
+        self.header = self.kwh = self.present = None
+        header_path = self.root / HEADER_FILENAME
+        if not header_path.exists():
+            return False
+        try:
+            header = json.loads(header_path.read_text(encoding="utf-8"))
+            if header.get("version") != self.VERSION:
+                return False
+            if dataset_version is not None and header.get("dataset_version") != dataset_version:
+                return False
+            self.header = header
+            if not header["applicable"]:
+                return False
+            kwh = np.load(self.root / KWH_FILENAME, mmap_mode="r")
+            present = np.load(self.root / PRESENT_FILENAME, mmap_mode="r")
+        except Exception as e:
+            logging.warning(f"⚠️ A 15 perces rács nem nyitható meg ({e}): {self.root}")
+            self.header = None
+            return False
+        if kwh.shape != (header["meters"], header["slots"]) or present.shape[1] * 8 < header["slots"]:
+            self.header = None
+            return False
+        self.kwh, self.present = kwh, present
+        self.origin = pd.Timestamp(header["origin"]).value
+        self.kwh_scale = WH_PER_KWH if header["kwh_unit"] == "Wh" else 1
+        return True
+
+    def slot(self, ts) -> int:
+        """Az időpontot tartalmazó rés indexe (a rácson kívül is, vágás nélkül)."""
+        return (pd.Timestamp(ts).value - self.origin) // SLOT_NS
+
+    def _slot_range(self, start, end) -> tuple[int, int]:
+        """A [start, end] időszakba eső rések [lo, hi) tartománya, a rácsra vágva."""
+        slots = self.header["slots"]
+        lo = 0 if start is None else -(-(pd.Timestamp(start).value - self.origin) // SLOT_NS)
+        hi = slots if end is None else self.slot(end) + 1
+        return min(max(lo, 0), slots), min(max(hi, 0), slots)
+
+    def _rows(self, meter: int | None) -> slice | list[int]:
+        if meter is None:
+            return slice(None)
+        return [meter] if 0 <= meter < self.header["meters"] else []
+
+    def value(self, ts, meter: int) -> float | None:
+        """Egy mérő adott negyedórás értéke O(1) időben; None, ha a rés hiányzik."""
+        i = self.slot(ts)
+        if not (0 <= i < self.header["slots"] and 0 <= meter < self.header["meters"]):
+            return None
+        if not (self.present[meter, i // 8] >> (7 - i % 8)) & 1:
+            return None
+        return float(self.kwh[meter, i]) / self.kwh_scale
+
+    def present_count(self, start=None, end=None, meter: int | None = None) -> int:
+        """A meglévő negyedórák száma az időszakban (a bittérkép popcountja)."""
+        lo, hi = self._slot_range(start, end)
+        bits = self.present[self._rows(meter)]
+        if hi <= lo or not len(bits):
+            return 0
+        b0, b1 = lo // 8, (hi - 1) // 8
+        head = np.unpackbits(bits[:, b0:b0 + 1], axis=1)
+        if b0 == b1:
+            return int(head[:, lo % 8:(hi - 1) % 8 + 1].sum())
+        tail = np.unpackbits(bits[:, b1:b1 + 1], axis=1)
+        body = POPCOUNT[bits[:, b0 + 1:b1]]
+        return int(head[:, lo % 8:].sum()) + int(body.sum(dtype=np.int64)) + int(tail[:, :(hi - 1) % 8 + 1].sum())
+
+    def missing_count(self, start=None, end=None, meter: int | None = None) -> int:
+        """A hiányzó negyedórák száma az időszak rácsra eső részén (mérőnként összeadva)."""
+        lo, hi = self._slot_range(start, end)
+        meters = self.header["meters"] if meter is None else len(self._rows(meter))
+        return max(hi - lo, 0) * meters - self.present_count(start, end, meter)
+
+    def sums(self, interval: str, start, end, meter: int | None = None) -> pd.Series:
+        """
+        A [start, end] időszak vödör-összegei (egy mérőé vagy az összesé) reshape-pel.
+
+        A vödrök az első és az utolsó adatot tartalmazó vödör között
+        folytonosak (a hiányzó vödör 0), mint a nyers sorok resample-je.
+        """
+        k = GRID_BUCKET_SLOTS[interval]
+        lo, hi = self._slot_range(start, end)
+        rows = self._rows(meter)
+        if hi <= lo or (isinstance(rows, list) and not rows):
+            return pd.Series(dtype="float64", name='Hatasos_ertek_kWh')
+        # A vödörhatárra bővített ablak; az időszakon kívüli rések nullázódnak
+        b0, b1 = lo // k * k, -(-hi // k) * k
+        values = np.asarray(self.kwh[rows, b0:b1], dtype="float64").sum(axis=0)
+        bits = np.unpackbits(self.present[rows, b0 // 8:-(-b1 // 8)], axis=1)[:, b0 % 8:b0 % 8 + b1 - b0].any(axis=0)
+        values[:lo - b0] = 0
+        values[hi - b0:] = 0
+        bits[:lo - b0] = False
+        bits[hi - b0:] = False
+        buckets = values.reshape(-1, k).sum(axis=1) / self.kwh_scale
+        filled = np.flatnonzero(bits.reshape(-1, k).any(axis=1))
+        if not len(filled):
+            return pd.Series(dtype="float64", name='Hatasos_ertek_kWh')
+        first, last = filled[0], filled[-1] + 1
+        labels = self.origin + (b0 + np.arange(first, last) * k) * SLOT_NS
+        index = pd.DatetimeIndex(labels.view("datetime64[ns]"), name='Kezdo_datum')
+        return pd.Series(buckets[first:last], index=index, name='Hatasos_ertek_kWh')
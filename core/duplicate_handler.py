@@ -101,13 +101,13 @@ class DuplicateHandler:
             self._log_process_start(initial_count)
 
         # 1. TELJES SOR DUPLIKÁCIÓK
-        df_clean = self._remove_full_duplicates(df)
+        df_clean = self._remove_full_duplicates(df, detailed_logging)
         after_full_dedup = len(df_clean)
         full_duplicates_removed = initial_count - after_full_dedup
 
         # 2. 🚨 EMERGENCY FIX ALGORITMUS - IDŐALAPÚ DUPLIKÁCIÓK
         df_clean, content_duplicates_removed = self._remove_time_based_duplicates(
-            df_clean, keep_strategy
+            df_clean, keep_strategy, detailed_logging
         )
 
         # 3. STATISZTIKÁK FRISSÍTÉSE
@@ -124,19 +124,22 @@ class DuplicateHandler:
 
         return df_clean
 
-    def _remove_full_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _remove_full_duplicates(
+        self, df: pd.DataFrame, verbose: bool = True
+    ) -> pd.DataFrame:
         """Teljes sor duplikációk eltávolítása"""
         df_clean = df.drop_duplicates()
         removed = len(df) - len(df_clean)
 
         if removed > 0:
             self.logger.info(f"🧹 Teljes sor duplikációk eltávolítva: {removed}")
-            print(f"🧹 Teljes sor duplikációk: {removed:,} eltávolítva")
+            if verbose:
+                print(f"🧹 Teljes sor duplikációk: {removed:,} eltávolítva")
 
         return df_clean
 
     def _remove_time_based_duplicates(
-        self, df: pd.DataFrame, keep_strategy: str
+        self, df: pd.DataFrame, keep_strategy: str, verbose: bool = True
     ) -> Tuple[pd.DataFrame, int]:
         """
         🚨 EMERGENCY FIX ALGORITMUS - IDŐALAPÚ DUPLIKÁCIÓ SZŰRÉS
@@ -151,10 +154,11 @@ class DuplicateHandler:
         """
         before_count = len(df)
 
-        print(f"🚨 EMERGENCY FIX ALGORITMUS ALKALMAZÁSA...")
-        print(f"   Kritériumok: Gyáriszám + Azonosító + Időintervallum")
-        print(f"   ❌ 'Hatasos_ertek_kWh' KIHAGYVA!")
-        print(f"   Stratégia: keep='{keep_strategy}' (javított adatok előnyben)")
+        if verbose:
+            print(f"🚨 EMERGENCY FIX ALGORITMUS ALKALMAZÁSA...")
+            print(f"   Kritériumok: Gyáriszám + Azonosító + Időintervallum")
+            print(f"   ❌ 'Hatasos_ertek_kWh' KIHAGYVA!")
+            print(f"   Stratégia: keep='{keep_strategy}' (javított adatok előnyben)")
 
         # 🚨 EMERGENCY FIX - IDŐALAPÚ DUPLIKÁCIÓ-SZŰRÉSI OSZLOPOK
         duplicate_columns = [
@@ -182,11 +186,12 @@ class DuplicateHandler:
             self.logger.info(
                 f"🚨 EMERGENCY FIX duplikációk eltávolítva: {content_removed}"
             )
-            print(f"🚨 EMERGENCY FIX duplikációk: {content_removed:,} eltávolítva")
-            print(f"   → Időalapú duplikációk kiszűrve!")
-            print(f"   → 13 duplikált nap javítva (Május, Június)!")
-            print(f"   → A helyes adatok megmaradtak (keep='{keep_strategy}')")
-        else:
+            if verbose:
+                print(f"🚨 EMERGENCY FIX duplikációk: {content_removed:,} eltávolítva")
+                print(f"   → Időalapú duplikációk kiszűrve!")
+                print(f"   → 13 duplikált nap javítva (Május, Június)!")
+                print(f"   → A helyes adatok megmaradtak (keep='{keep_strategy}')")
+        elif verbose:
             print(f"✅ Nem voltak időalapú duplikációk")
 
         return df_clean, content_removed
@@ -395,6 +400,19 @@ def create_duplicate_handler(strategy: str = "emergency_fix_v1") -> DuplicateHan
     return DuplicateHandler(strategy=strategy)
 
 
+def merge_with_existing(existing_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Új sorok hozzáfűzése egy már tisztított adatkészlethez.
+
+    Ütköző időpontnál az újabb export értéke nyer (a 'last' stratégiának megfelelően);
+    mérőkód esetén az ütközés mérőnként értendő.
+    """
+    key = [c for c in ("Kezdo_datum", "Mero_kod") if c in existing_df.columns and c in new_df.columns]
+    existing_keys = pd.MultiIndex.from_frame(existing_df[key])
+    kept = existing_df[~existing_keys.isin(pd.MultiIndex.from_frame(new_df[key]))]
+    return pd.concat([kept, new_df], ignore_index=True)
+
+
 def quick_duplicate_removal(
     df: pd.DataFrame, keep: str = "last", validate: bool = True
 ) -> pd.DataFrame:
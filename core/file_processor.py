@@ -2,45 +2,371 @@
 # -*- coding: utf-8 -*-
 # VÉGLEGES, GOLYÓÁLLÓ VERZIÓ
 
+import codecs
+import csv
 import logging
+import os
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field, replace
 from pathlib import Path
-import shutil
 import pandas as pd
 
+from backup_store import KEEP_DAILY, KEEP_MONTHLY, BackupStore
+from csv_engines import PandasCsvEngine, create_engine, iter_chunks_with_fallback
+from datetime_parser import DatetimeParser, DatetimeStats
+from ingest_manifest import IngestManifest
+from input_sources import INPUT_PATTERNS, InputSource, as_source, expand_sources, is_input_file, read_prefix
+from meter_registry import MeterRegistry
+from sidecar_cache import SidecarCache
+
+# Növelendő, ha a tisztítás eredménye változik: a régi normalizált gyorsítótár ekkor érvénytelen
+NORMALIZATION_VERSION = 1
+
+STANDARD_COLUMNS = ['Gyariszam', 'Azonosito', 'Kezdo_datum', 'Zaro_datum', 'Hatasos_ertek_kWh']
+
+COLUMN_MAP = {
+    'gyáriszám': 'Gyariszam',
+    'azonosító': 'Azonosito',
+    'kezdő dátum': 'Kezdo_datum',
+    'záró dátum': 'Zaro_datum',
+    'hatásos érték [kwh]': 'Hatasos_ertek_kWh'
+}
+
+FALLBACK_ENCODINGS = ["utf-8-sig", "ISO-8859-2", "cp1250", "latin1"]
+CANDIDATE_DELIMITERS = [";", ",", "\t", "|"]
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 50
+
+# A cp1250-ben nem definiált bájtok; ha ilyen előfordul, csak a latin1 marad
+CP1250_UNDEFINED = {0x81, 0x83, 0x88, 0x90, 0x98}
+
+
+def normalize_header(col) -> str:
+    """Fejléc egységesítése a COLUMN_MAP kulcsaihoz."""
+    return str(col).strip().strip('"').lower().replace('_', ' ')
+
+
+def resolve_columns(columns) -> dict[str, str]:
+    """A fejléc oszlopait a szabványos nevekre képezi; minden szabványos oszlopot az első találat ad."""
+    resolved = {}
+    for col in columns:
+        standard_name = COLUMN_MAP.get(normalize_header(col))
+        if standard_name and standard_name not in resolved.values():
+            resolved[col] = standard_name
+    return resolved
+
+
+@dataclass
+class CsvFormat:
+    """Egy forrásfájl bájtszintű felismerésének eredménye."""
+
+    encoding: str
+    delimiter: str
+    header_row: int
+    detection: str
+    columns: list[str] = field(default_factory=list)
+    decimal: str = "."
+
+    @property
+    def signature(self) -> tuple:
+        """Fejléc-aláírás a dátumformátum gyorsítótárához."""
+        return (tuple(self.columns), self.encoding, self.delimiter)
+
+    def describe(self) -> str:
+        return f"kódolás={self.encoding}, elválasztó={self.delimiter!r}, tizedesjel={self.decimal!r}, fejléc sor={self.header_row}, út={self.detection}"
+
+
+def detect_encoding(prefix: bytes) -> tuple[str, str]:
+    """Kódolás kiválasztása a fájl elejéből; visszaadja a kódolást és a döntés okát."""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig", "bom"
+    try:
+        # Nem-final dekódolás: a prefix végén elvágott többbájtos karakter nem hiba
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", "utf-8-valid"
+    except UnicodeDecodeError:
+        pass
+    high_control = {b for b in prefix if 0x80 <= b <= 0x9F}
+    if high_control & CP1250_UNDEFINED:
+        return "latin1", "undefined-cp1250-bytes"
+    if high_control:
+        return "cp1250", "c1-bytes"
+    return "ISO-8859-2", "no-c1-bytes"
+
+
+def detect_decimal(lines: list[str], delimiter: str, columns: list[str]) -> str:
+    """A kWh oszlop mintaértékeiből eldönti, hogy tizedesvessző vagy -pont szerepel-e."""
+    if delimiter == ",":
+        return "."
+    kwh_index = next((i for i, col in enumerate(columns) if COLUMN_MAP.get(normalize_header(col)) == 'Hatasos_ertek_kWh'), None)
+    if kwh_index is None:
+        return "."
+    for row in csv.reader(lines, delimiter=delimiter):
+        if len(row) > kwh_index and "," in row[kwh_index]:
+            return ","
+    return "."
+
+
+def detect_layout(lines: list[str]) -> tuple[str, int, str]:
+    """
+    Elválasztó és fejléc sor keresése.
+
+    Elsőként az ismert oszlopneveket tartalmazó sort keressük; ha nincs ilyen,
+    a legtöbb, soronként azonos számú mezőt adó elválasztó nyer.
+    """
+    best = None
+    for row, line in enumerate(lines):
+        for delimiter in CANDIDATE_DELIMITERS:
+            hits = sum(normalize_header(field) in COLUMN_MAP for field in line.split(delimiter))
+            if hits and (best is None or hits > best[0]):
+                best = (hits, delimiter, row)
+        if best is not None and best[0] == len(COLUMN_MAP):
+            break
+    if best is not None:
+        return best[1], best[2], "header-match"
+
+    non_empty = [line for line in lines if line.strip()]
+    scored = []
+    for delimiter in CANDIDATE_DELIMITERS:
+        counts = [line.count(delimiter) for line in non_empty]
+        if not counts or max(counts) == 0:
+            continue
+        modal = max(set(counts), key=counts.count)
+        scored.append((counts.count(modal), modal, delimiter))
+    if not scored:
+        return ";", 0, "default"
+    _, modal, delimiter = max(scored)
+    header_row = next(i for i, line in enumerate(lines) if line.count(delimiter) == modal)
+    return delimiter, header_row, "field-count"
+
+
 class FileProcessor:
     """Fájlkezelő modul, amely soha nem hibázik csendben."""
 
-    def __init__(self) -> None:
+    def __init__(self, engine: str = "auto", arrow_dtypes: bool = False, keep_daily: int = KEEP_DAILY, keep_monthly: int = KEEP_MONTHLY) -> None:
         self.base_dir = next((p for p in Path(__file__).resolve().parents if (p / 'venv').exists() or (p / '.git').exists()), Path.cwd())
         self.input_dir = self.base_dir / "CSV-eredeti"
         self.output_dir = self.base_dir / "CSV-normalis"
         self.log_dir = self.base_dir / "logs"
         self.backup_dir = self.base_dir / "backups"
+        self.backups = BackupStore(self.backup_dir, keep_daily=keep_daily, keep_monthly=keep_monthly)
+        self.meters = MeterRegistry(self.output_dir)
+        self.engine = create_engine(engine, arrow_dtypes=arrow_dtypes)
+        self.sidecars = SidecarCache(self.output_dir, f"n{NORMALIZATION_VERSION}{'a' if arrow_dtypes else ''}")
+        self.detection_report: dict[str, CsvFormat] = {}
+        self.datetime_parser = DatetimeParser()
+        self.datetime_report: dict[str, DatetimeStats] = {}
         for d in [self.input_dir, self.output_dir, self.log_dir, self.backup_dir]:
             d.mkdir(exist_ok=True)
 
-    def load_csv_file(self, path: Path) -> pd.DataFrame | None:
-        """Beolvas egy CSV fájlt, több kódolást is megpróbálva."""
-        encodings = ["utf-8-sig", "ISO-8859-2", "cp1250", "latin1"]
-        for enc in encodings:
+    def list_input_files(self) -> list[InputSource]:
+        """A bemeneti mappa forrásai (ZIP csomagoknál tagonként), név szerint rendezve."""
+        physical = {p for pattern in INPUT_PATTERNS for p in self.input_dir.glob(pattern)}
+        return expand_sources(sorted(physical))
+
+    @staticmethod
+    def is_input_file(path: Path) -> bool:
+        """Igaz, ha a fájl valamelyik bemeneti mintára illeszkedik."""
+        return is_input_file(path)
+
+    def detect_format(self, path: Path | InputSource) -> CsvFormat:
+        """Egyetlen prefix-olvasással meghatározza a kódolást, az elválasztót és a fejléc sort."""
+        with as_source(path).open() as fh:
+            prefix = read_prefix(fh, SNIFF_BYTES)
+        encoding, reason = detect_encoding(prefix)
+        text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(prefix, final=False)
+        lines = text.splitlines()
+        if len(prefix) == SNIFF_BYTES and len(lines) > 1:
+            lines = lines[:-1]  # az utolsó sor csonka lehet
+        delimiter, header_row, layout_reason = detect_layout(lines[:SNIFF_LINES])
+        columns = next(csv.reader([lines[header_row]], delimiter=delimiter), []) if header_row < len(lines) else []
+        decimal = detect_decimal(lines[header_row + 1:header_row + 1 + SNIFF_LINES], delimiter, columns)
+        return CsvFormat(encoding, delimiter, header_row, f"{reason}/{layout_reason}", columns, decimal)
+
+    def _detect_format_or_none(self, source: InputSource) -> CsvFormat | None:
+        """Formátumfelismerés; a meg sem nyitható forrás (sérült tömörítés, hiányzó kibontó) kimarad."""
+        try:
+            return self.detect_format(source)
+        except Exception as e:
+            logging.error(f"❌ VÉGLEGES HIBA: '{source.name}' nem nyitható meg ({e}). KIHAGYVA.")
+            return None
+
+    def load_csv_file(self, path: Path | InputSource) -> pd.DataFrame | None:
+        """
+        Beolvas egy CSV fájlt egyetlen menetben, a felismert formátummal.
+
+        Csak a COLUMN_MAP szerinti oszlopok kerülnek beolvasásra (usecols), a
+        szabványos nevekre átnevezve; a többi oszlop (meddő energia, státusz...)
+        nem kerül a memóriába. Hiányzó oszlopok esetén None.
+        """
+        path = as_source(path)
+        fmt = self._detect_format_or_none(path)
+        if fmt is None:
+            return None
+        resolved = resolve_columns(fmt.columns)
+        if set(resolved.values()) != set(STANDARD_COLUMNS):
+            logging.warning(f"⚠️ '{path.name}': a fejlécből nem oldható fel minden oszlop ({fmt.describe()}), tartalék beolvasás.")
+            return self._load_csv_file_fallback(path)
+        for engine in self._engines():
+            try:
+                df = engine.read(path, fmt, resolved)
+                if not df.empty:
+                    self.detection_report[path.name] = fmt
+                    logging.info(f"✅ Sikeres beolvasás: '{path.name}' ({fmt.describe()}, motor={engine.name}).")
+                    return df.rename(columns=resolved)[STANDARD_COLUMNS]
+            except Exception as e:
+                logging.warning(f"⚠️ A felismert formátum nem vált be: '{path.name}' ({fmt.describe()}, motor={engine.name}): {e}")
+        return self._load_csv_file_fallback(path)
+
+    def _engines(self) -> list:
+        """A kiválasztott motor, mögötte tartaléknak a pandas motor."""
+        if isinstance(self.engine, PandasCsvEngine):
+            return [self.engine]
+        return [self.engine, PandasCsvEngine()]
+
+    def iter_clean_chunks(self, path: Path | InputSource, chunksize: int):
+        """
+        Darabonként olvassa, normalizálja és típusosítja a fájlt.
+
+        Ha a fejléc nem oldható fel, a tartalék (egész fájlos) beolvasás
+        eredménye egyetlen darabként jön vissza.
+        """
+        path = as_source(path)
+        digest = self._content_digest(path)
+        if digest is not None and self._sidecar_hit(path, digest):
+            for part in self.sidecars.iter_parts(digest):
+                for offset in range(0, len(part), chunksize):
+                    yield part.iloc[offset:offset + chunksize]
+            return
+        fmt = self._detect_format_or_none(path)
+        if fmt is None:
+            return
+        resolved = resolve_columns(fmt.columns)
+        if set(resolved.values()) != set(STANDARD_COLUMNS):
+            df = self.load_clean_file(path)
+            if df is not None:
+                yield df
+            return
+        self.detection_report[path.name] = fmt
+        logging.info(f"✅ Darabolt beolvasás: '{path.name}' ({fmt.describe()}, motor={self.engine.name}, {chunksize} soros darabok).")
+        before = replace(self.datetime_parser.stats)
+        with self._sidecar_writer(digest, fmt) as add_part:
+            for chunk in iter_chunks_with_fallback(self._engines(), path, fmt, resolved, chunksize):
+                cleaned = self.clean_frame(chunk.rename(columns=resolved)[STANDARD_COLUMNS], fmt.signature)
+                add_part(cleaned)
+                yield cleaned
+        self._record_datetime_stats(path, before)
+
+    def _record_datetime_stats(self, path: Path | InputSource, before: DatetimeStats) -> None:
+        """Egy fájl dátumértelmezési számlálói (a parser összesítőjének különbsége)."""
+        after = self.datetime_parser.stats
+        self.datetime_report[path.name] = DatetimeStats(
+            after.parsed - before.parsed, after.fallback - before.fallback, after.failed - before.failed
+        )
+
+    def clean_frame(self, df: pd.DataFrame, signature: tuple = ()) -> pd.DataFrame:
+        """Egy normalizált adatkeret numerikus és dátum oszlopainak típusossá alakítása."""
+        df = df.copy()
+        kwh = df['Hatasos_ertek_kWh']
+        if pd.api.types.is_numeric_dtype(kwh):
+            df['Hatasos_ertek_kWh'] = kwh.astype('float64')
+        else:
+            # Tartalék út: vegyes/hibás értékek vagy a régi, szöveges beolvasás
+            df['Hatasos_ertek_kWh'] = pd.to_numeric(kwh.astype(str).str.replace(',', '.'), errors='coerce')
+        df['Kezdo_datum'] = self.datetime_parser.parse(df['Kezdo_datum'], signature)
+        df['Zaro_datum'] = self.datetime_parser.parse(df['Zaro_datum'], signature)
+        df.dropna(subset=['Kezdo_datum', 'Zaro_datum', 'Hatasos_ertek_kWh'], inplace=True)
+        return df
+
+    def load_clean_file(self, path: Path | InputSource) -> pd.DataFrame | None:
+        """
+        Beolvasás, normalizálás és típusosítás egy lépésben (egy fájlra).
+
+        Azonos tartalmú, már normalizált fájlnál a CSV értelmezése elmarad,
+        az eredmény a normalizált gyorsítótárból jön.
+        """
+        path = as_source(path)
+        digest = self._content_digest(path)
+        if digest is not None and self._sidecar_hit(path, digest):
+            return self.sidecars.read(digest)
+        df = self.load_csv_file(path)
+        if df is None:
+            return None
+        before = replace(self.datetime_parser.stats)
+        fmt = self.detection_report[path.name]
+        cleaned = self.clean_frame(df, fmt.signature)
+        self._record_datetime_stats(path, before)
+        with self._sidecar_writer(digest, fmt) as add_part:
+            add_part(cleaned)
+        return cleaned
+
+    def _content_digest(self, path: InputSource) -> str | None:
+        """A gyorsítótár kulcsa; olvashatatlan forrásnál None (a beolvasás jelzi a hibát)."""
+        try:
+            return path.sha256()
+        except Exception:
+            return None
+
+    def _sidecar_hit(self, path: InputSource, digest: str) -> bool:
+        """Találatnál a felismert formátumot is visszaállítja a riportokhoz."""
+        meta = self.sidecars.meta(digest)
+        if meta is None:
+            return False
+        self.detection_report[path.name] = CsvFormat(**meta["format"])
+        logging.info(f"♻️ Normalizált gyorsítótárból: '{path.name}' ({meta['rows']} sor, a CSV értelmezése kimarad).")
+        return True
+
+    def _sidecar_writer(self, digest: str | None, fmt: CsvFormat):
+        """A normalizált darabok mentése a gyorsítótárba (lenyomat nélkül nincs mentés)."""
+        if digest is None:
+            return nullcontext(lambda df: None)
+        return self.sidecars.writer(digest, {"format": asdict(fmt)})
+
+    def _load_csv_file_fallback(self, path: Path | InputSource) -> pd.DataFrame | None:
+        """Régi viselkedés: több kódolás egymás utáni kipróbálása."""
+        for enc in FALLBACK_ENCODINGS:
             try:
-                df = pd.read_csv(path, sep=";", encoding=enc, low_memory=False, on_bad_lines="warn")
+                with path.readable() as target:
+                    df = pd.read_csv(target, sep=";", encoding=enc, dtype=str, on_bad_lines="warn")
                 if not df.empty and len(df.columns) > 5:
-                    logging.info(f"✅ Sikeres beolvasás: '{path.name}' ('{enc}').")
-                    return df
+                    return self._project_fallback(path, df, enc)
             except Exception:
                 continue
         
         logging.error(f"❌ VÉGLEGES HIBA: '{path.name}' fájlt nem sikerült beolvasni. KIHAGYVA.")
         return None
 
+    def _project_fallback(self, path: Path | InputSource, df: pd.DataFrame, enc: str) -> pd.DataFrame | None:
+        """A tartalék úton beolvasott teljes adatkeret szűkítése a szabványos oszlopokra."""
+        resolved = resolve_columns(df.columns)
+        missing = [name for name in STANDARD_COLUMNS if name not in resolved.values()]
+        if missing:
+            logging.warning(f"⚠️ '{path.name}' kihagyva: hiányzó oszlopok: {missing}, talált: {list(resolved.values())}")
+            return None
+        self.detection_report[path.name] = CsvFormat(enc, ";", 0, "fallback", list(df.columns))
+        logging.info(f"✅ Sikeres beolvasás: '{path.name}' ('{enc}', tartalék út).")
+        return df.rename(columns=resolved)[STANDARD_COLUMNS]
+
+    def backup_file(self, path: Path, reason: str = "write") -> None:
+        """
+        Tartalomcímzett mentés a meglévő, nem üres kimeneti fájlról vagy tároló-mappáról.
+
+        A mentés a lemezen lévő manifeszt fájllistáját is rögzíti (az még a
+        mentett állapothoz tartozik), így visszaállítás után a később
+        beolvasott fájlok újra sorra kerülnek. A visszaállítás előtti mentés
+        nem indít törlést, így a visszaállítandó mentés közben nem tűnhet el.
+        """
+        ingested = IngestManifest(self.output_dir / "ingest_manifest.json").fingerprints()
+        self.backups.snapshot(path, retention=reason == "write", ingested=ingested, reason=reason)
+
     def save_csv_file(self, df: pd.DataFrame, path: Path, create_backup: bool = True) -> bool:
-        """Elment egy DataFrame-et CSV formátumba."""
+        """Elment egy DataFrame-et CSV formátumba (ideiglenes fájlba, majd atomikus cserével)."""
         try:
-            if create_backup and path.exists() and path.stat().st_size > 0:
-                backup_name = f"{path.stem}_backup_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                shutil.copy2(path, self.backup_dir / backup_name)
-            df.to_csv(path, sep=";", encoding="utf-8-sig", index=False)
+            if create_backup:
+                self.backup_file(path)
+            tmp_path = path.with_name(path.name + ".tmp")
+            df.to_csv(tmp_path, sep=";", encoding="utf-8-sig", index=False)
+            os.replace(tmp_path, path)
             return True
         except Exception as e:
             logging.error(f"❌ Mentési hiba a(z) '{path}' fájlnál: {e}")
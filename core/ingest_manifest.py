@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# INKREMENTÁLIS BEOLVASÁSI MANIFESZT
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from input_sources import InputSource, as_source
+
+
+@dataclass
+class ManifestEntry:
+    """Egy már feldolgozott forrásfájl lenyomata."""
+
+    name: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    row_count: int
+    date_start: str | None
+    date_end: str | None
+    ingested_at: str
+
+
+@dataclass
+class ManifestDiff:
+    """A mappa aktuális állapotának összevetése a manifeszttel."""
+
+    new: list[InputSource] = field(default_factory=list)
+    changed: list[InputSource] = field(default_factory=list)
+    unchanged: list[InputSource] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    @property
+    def has_work(self) -> bool:
+        return bool(self.new or self.changed or self.removed)
+
+
+def file_sha256(path: Path | InputSource, block_size: int = 1 << 20) -> str:
+    """A (kibontott) tartalom SHA-256 lenyomata, blokkonként olvasva."""
+    return as_source(path).sha256(block_size)
+
+
+class IngestManifest:
+    """A már beolvasott fájlok nyilvántartása (méret, mtime, hash, sorok, időszak)."""
+
+    VERSION = 2  # 2: a tárolók mérőkódot is tartalmaznak
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, ManifestEntry] = {}
+        self.dataset_version = 0
+        self.store: str | None = None  # a tároló, amelyhez a nyilvántartás tartozik
+        self.load()
+
+    def load(self) -> None:
+        """Beolvassa a manifesztet; sérült vagy régi formátum esetén üresen indul."""
+        if not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            # A verziószám elavult formátumnál is megmarad, így a GUI nem nyit meg régi gyorsítótárat
+            self.dataset_version = int(raw.get("dataset_version", 0))
+            if raw.get("version") != self.VERSION:
+                logging.warning(f"⚠️ A manifeszt formátuma elavult, teljes újraépítés következik: {self.path.name}")
+                return
+            self.store = raw.get("store")
+            self.entries = {e["name"]: ManifestEntry(**e) for e in raw.get("files", [])}
+        except Exception as e:
+            logging.warning(f"⚠️ A manifeszt nem olvasható ({e}), teljes újraépítés következik.")
+            self.entries = {}
+            self.dataset_version = 0
+
+    def save(self) -> None:
+        """Atomikusan kiírja a manifesztet (ideiglenes fájl + csere)."""
+        payload = {
+            "version": self.VERSION,
+            "dataset_version": self.dataset_version,
+            "store": self.store,
+            "files": [asdict(e) for e in sorted(self.entries.values(), key=lambda e: e.name)],
+        }
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def classify(self, files: list[Path | InputSource]) -> ManifestDiff:
+        """
+        Szétválogatja a fájlokat új / módosult / változatlan kategóriákba.
+
+        A méret + mtime egyezése elég a változatlansághoz, hash-t csak akkor
+        számolunk, ha ezek eltérnek (pl. átmásolt, de azonos tartalmú fájl).
+        """
+        diff = ManifestDiff()
+        seen = set()
+        for path in map(as_source, files):
+            seen.add(path.name)
+            entry = self.entries.get(path.name)
+            stat = path.stat()
+            if entry is None:
+                diff.new.append(path)
+            elif entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                diff.unchanged.append(path)
+            elif entry.size == stat.st_size and entry.sha256 == file_sha256(path):
+                entry.mtime_ns = stat.st_mtime_ns
+                diff.unchanged.append(path)
+            else:
+                diff.changed.append(path)
+        diff.removed = sorted(name for name in self.entries if name not in seen)
+        return diff
+
+    def can_append(self, diff: ManifestDiff) -> bool:
+        """
+        Igaz, ha az új fájlok a meglévő adatkészlethez fűzhetők teljes újraépítés nélkül.
+
+        A duplikáció-szűrés a fájlnév szerinti sorrendben a későbbit tartja meg,
+        ezért csak a már feldolgozott fájlok után rendeződő új fájl fűzhető hozzá.
+        """
+        if not self.entries or diff.changed or diff.removed:
+            return False
+        last_ingested = max(self.entries)
+        return all(path.name > last_ingested for path in diff.new)
+
+    def record(self, path: Path | InputSource, df: pd.DataFrame | None) -> None:
+        """Rögzíti egy fájl feldolgozását a normalizált és tisztított adatai alapján."""
+        if df is None or df.empty:
+            self.record_stats(path, 0, None, None)
+        else:
+            self.record_stats(path, len(df), df["Kezdo_datum"].min(), df["Kezdo_datum"].max())
+
+    def record_stats(self, path: Path | InputSource, row_count: int, date_start, date_end) -> None:
+        """Rögzíti egy fájl feldolgozását előre kiszámolt sorszám és időszak alapján."""
+        path = as_source(path)
+        stat = path.stat()
+        self.entries[path.name] = ManifestEntry(
+            name=path.name,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=self._safe_sha256(path),
+            row_count=row_count,
+            date_start=None if date_start is None else str(date_start),
+            date_end=None if date_end is None else str(date_end),
+            ingested_at=pd.Timestamp.now().isoformat(timespec="seconds"),
+        )
+
+    @staticmethod
+    def _safe_sha256(source: InputSource) -> str:
+        """Hash a nyilvántartáshoz; olvashatatlan forrásnál üres (a méret + mtime így is azonosít)."""
+        try:
+            return source.sha256()
+        except Exception as e:
+            logging.warning(f"⚠️ '{source.name}' lenyomata nem számolható: {e}")
+            return ""
+
+    def fingerprints(self) -> dict[str, str]:
+        """A nyilvántartott fájlok neve és lenyomata (a biztonsági mentések ezt rögzítik)."""
+        return {name: entry.sha256 for name, entry in self.entries.items()}
+
+    def keep_only(self, fingerprints: dict[str, str]) -> list[str]:
+        """
+        Visszaállítás után törli azokat a fájlokat, amelyek nem (vagy más tartalommal) kerültek a mentésbe.
+
+        Ezek sorai nincsenek a visszaállított adatkészletben, így a következő
+        futás újként kezeli (és újra beolvassa) őket.
+        """
+        forgotten = sorted(name for name, entry in self.entries.items() if fingerprints.get(name) != entry.sha256)
+        for name in forgotten:
+            del self.entries[name]
+        return forgotten
+
+    def reset(self) -> None:
+        """Teljes újraépítés előtt törli a nyilvántartott fájlokat."""
+        self.entries = {}
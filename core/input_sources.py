@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# BEMENETI FORRÁSOK: SIMA, TÖMÖRÍTETT ÉS ZIP-BEN CSOMAGOLT CSV EXPORTOK
+
+import gzip
+import hashlib
+import logging
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # opcionális függőség, nélküle a .csv.zst fájlok kimaradnak
+    zstandard = None
+
+INPUT_PATTERNS = ["*.csv", "*.csv.gz", "*.csv.zst", "*.zip"]
+MEMBER_SEPARATOR = "::"
+
+# Egy futáson belül a (forrás, méret, mtime) lenyomata csak egyszer számolódik
+_DIGESTS: dict[tuple, str] = {}
+
+
+class ZipMemberStream:
+    """Egy ZIP tag folyama, amely bezáráskor a csomagot (és a fájlleírót) is bezárja."""
+
+    def __init__(self, archive: zipfile.ZipFile, stream: BinaryIO) -> None:
+        self.archive = archive
+        self.stream = stream
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self.archive.close()
+
+
+@dataclass(frozen=True)
+class InputSource:
+    """
+    Egy beolvasható CSV forrás: sima fájl, .csv.gz / .csv.zst, vagy egy ZIP tag.
+
+    A tartalom mindig folyamként, kibontás nélkül jut el a parserig; a név
+    ZIP tagoknál 'csomag.zip::tag.csv' alakú, ez a manifeszt és a riportok kulcsa.
+    """
+
+    path: Path
+    member: str | None = None
+
+    @property
+    def name(self) -> str:
+        if self.member is None:
+            return self.path.name
+        return f"{self.path.name}{MEMBER_SEPARATOR}{self.member}"
+
+    @property
+    def compression(self) -> str | None:
+        if self.member is not None:
+            return "zip"
+        suffix = self.path.suffix.lower()
+        return {".gz": "gzip", ".zst": "zstd"}.get(suffix)
+
+    def open(self) -> BinaryIO:
+        """Kibontott tartalmú bináris folyam."""
+        if self.compression is None:
+            return open(self.path, "rb")
+        if self.compression == "gzip":
+            return gzip.open(self.path, "rb")
+        if self.compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError(f"'{self.name}': a .zst fájlokhoz a zstandard csomag szükséges.")
+            return zstandard.ZstdDecompressor().stream_reader(open(self.path, "rb"), closefd=True)
+        archive = zipfile.ZipFile(self.path)
+        try:
+            return ZipMemberStream(archive, archive.open(self.member))
+        except Exception:
+            archive.close()
+            raise
+
+    @contextmanager
+    def readable(self):
+        """Parsernek átadható cél: sima fájlnál az útvonal, egyébként a kibontó folyam."""
+        if self.compression is None:
+            yield self.path
+            return
+        with self.open() as fh:
+            yield fh
+
+    def stat(self):
+        """Méret és mtime a manifeszthez; ZIP tagnál a tag mérete és a csomag mtime-ja."""
+        if self.member is None:
+            return self.path.stat()
+        with zipfile.ZipFile(self.path) as zf:
+            info = zf.getinfo(self.member)
+        return SimpleNamespace(st_size=info.file_size, st_mtime_ns=self.path.stat().st_mtime_ns)
+
+    def sha256(self, block_size: int = 1 << 20) -> str:
+        """A kibontott tartalom SHA-256 lenyomata (méret + mtime szerint memoizálva)."""
+        stat = self.stat()
+        key = (self, stat.st_size, stat.st_mtime_ns)
+        if key not in _DIGESTS:
+            digest = hashlib.sha256()
+            with self.open() as fh:
+                for block in iter(lambda: fh.read(block_size), b""):
+                    digest.update(block)
+            _DIGESTS[key] = digest.hexdigest()
+        return _DIGESTS[key]
+
+
+def as_source(path) -> InputSource:
+    """Path vagy InputSource egységesítése."""
+    return path if isinstance(path, InputSource) else InputSource(Path(path))
+
+
+def is_input_file(path: Path) -> bool:
+    """Igaz, ha a fájl valamelyik bemeneti mintára illeszkedik."""
+    return any(Path(path).match(pattern) for pattern in INPUT_PATTERNS)
+
+
+def expand_sources(paths: list[Path]) -> list[InputSource]:
+    """A fizikai fájlokból forráslista; a ZIP csomagok CSV tagjai külön forrásként, név szerint rendezve."""
+    sources = []
+    for path in paths:
+        if path.suffix.lower() != ".zip":
+            sources.append(InputSource(path))
+            continue
+        try:
+            with zipfile.ZipFile(path) as zf:
+                members = [info.filename for info in zf.infolist() if not info.is_dir() and info.filename.lower().endswith(".csv")]
+        except zipfile.BadZipFile as e:
+            logging.error(f"❌ Sérült ZIP csomag, KIHAGYVA: '{path.name}' ({e})")
+            continue
+        sources.extend(InputSource(path, member) for member in members)
+    return sorted(sources, key=lambda s: s.name)
+
+
+def read_prefix(fh: BinaryIO, size: int) -> bytes:
+    """Legfeljebb size bájt beolvasása; a kibontó folyamok egy hívásra kevesebbet is adhatnak."""
+    chunks, remaining = [], size
+    while remaining > 0:
+        block = fh.read(remaining)
+        if not block:
+            break
+        chunks.append(block)
+        remaining -= len(block)
+    return b"".join(chunks)
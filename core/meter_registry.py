@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# MÉRŐAZONOSÍTÓK SZÓTÁRKÓDOLÁSA (GYÁRISZÁM + AZONOSÍTÓ → EGÉSZ KÓD)
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_FILENAME = "meters.json"
+METER_DTYPE = np.dtype("int32")
+
+
+@dataclass
+class Meter:
+    """Egy mérő (csatorna) a szótárban."""
+
+    code: int
+    gyariszam: str
+    azonosito: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.gyariszam} / {self.azonosito}"
+
+
+class MeterRegistry:
+    """
+    A (Gyariszam, Azonosito) párok és egész kódjaik nyilvántartása.
+
+    A tárolók csak a kódot őrzik, így a mérő szerinti szűrés és csoportosítás
+    egész számok összehasonlítása. A szótár csak bővül: egy mérő kódja a
+    teljes újraépítések után is ugyanaz marad.
+    """
+
+    VERSION = 1
+
+    def __init__(self, output_dir: Path) -> None:
+        self.path = output_dir / REGISTRY_FILENAME
+        self.meters: dict[int, Meter] = {}
+        self.codes: dict[tuple[str, str], int] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            if raw.get("version") == self.VERSION:
+                for item in raw.get("meters", []):
+                    self._add(Meter(**item))
+        except Exception as e:
+            logging.warning(f"⚠️ A mérő-szótár nem olvasható ({e}): {self.path}")
+
+    def save(self) -> None:
+        payload = {"version": self.VERSION, "meters": [asdict(self.meters[code]) for code in sorted(self.meters)]}
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def _add(self, meter: Meter) -> None:
+        self.meters[meter.code] = meter
+        self.codes[(meter.gyariszam, meter.azonosito)] = meter.code
+
+    def encode(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        A sorok mérőkódjai; az új mérők bekerülnek a szótárba (és az azonnal mentődik).
+
+        A szövegek összevetése csak a keretben előforduló különböző párokra
+        fut, a sorokhoz a kód egy tömbindexeléssel kerül.
+        """
+        if df.empty:
+            return np.empty(0, dtype=METER_DTYPE)
+        keys = pd.MultiIndex.from_arrays([
+            df['Gyariszam'].fillna("").astype(str).to_numpy(),
+            df['Azonosito'].fillna("").astype(str).to_numpy(),
+        ])
+        row_codes, uniques = pd.factorize(keys)
+        added = []
+        lookup = np.empty(len(uniques), dtype=METER_DTYPE)
+        for i, key in enumerate(uniques):
+            if key not in self.codes:
+                meter = Meter(len(self.meters), *key)
+                self._add(meter)
+                added.append(meter)
+            lookup[i] = self.codes[key]
+        if added:
+            self.save()
+            for meter in added:
+                logging.info(f"🔢 Új mérő a szótárban: {meter.code} = {meter.label}")
+        return lookup[row_codes]
+
+    def labels(self) -> dict[int, str]:
+        """Kód → megjelenítendő név (a GUI választólistájához)."""
+        return {code: self.meters[code].label for code in sorted(self.meters)}
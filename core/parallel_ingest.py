@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# PÁRHUZAMOS FÁJLBEOLVASÁS (PROCESS POOL)
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datetime_parser import DatetimeStats
+from file_processor import STANDARD_COLUMNS, CsvFormat, FileProcessor
+from input_sources import InputSource
+
+ID_COLUMNS = ['Gyariszam', 'Azonosito']
+DATE_COLUMNS = ['Kezdo_datum', 'Zaro_datum']
+
+_worker_fp: FileProcessor | None = None
+
+
+def frame_to_columns(df: pd.DataFrame) -> dict[str, tuple]:
+    """
+    Tömör oszloptömbök a folyamatok közötti átadáshoz.
+
+    Az azonosítók szótárkódolva (int32 kódok + egyedi értékek), a dátumok
+    int64 nanoszekundumként, a kWh float64-ként utaznak; így nem kell
+    objektum DataFrame-et pickle-özni.
+    """
+    columns = {}
+    for name in ID_COLUMNS:
+        codes, uniques = pd.factorize(df[name])
+        columns[name] = (codes.astype(np.int32), np.asarray(uniques, dtype=object))
+    for name in DATE_COLUMNS:
+        columns[name] = (df[name].to_numpy(dtype="datetime64[ns]").view(np.int64),)
+    columns['Hatasos_ertek_kWh'] = (df['Hatasos_ertek_kWh'].to_numpy(dtype=np.float64),)
+    return columns
+
+
+def columns_to_frame(columns: dict[str, tuple]) -> pd.DataFrame:
+    """A frame_to_columns inverze."""
+    data = {}
+    for name in ID_COLUMNS:
+        codes, uniques = columns[name]
+        values = np.full(len(codes), np.nan, dtype=object)
+        present = codes >= 0
+        values[present] = uniques[codes[present]]
+        data[name] = values
+    for name in DATE_COLUMNS:
+        data[name] = columns[name][0].view("datetime64[ns]")
+    data['Hatasos_ertek_kWh'] = columns['Hatasos_ertek_kWh'][0]
+    return pd.DataFrame(data, columns=STANDARD_COLUMNS)
+
+
+def _init_worker(engine: str, arrow_dtypes: bool) -> None:
+    global _worker_fp
+    _worker_fp = FileProcessor(engine=engine, arrow_dtypes=arrow_dtypes)
+
+
+def _ingest_worker(path: InputSource) -> tuple[dict | None, CsvFormat | None, DatetimeStats | None]:
+    """Egy fájl beolvasása, normalizálása és tisztítása egy munkafolyamatban."""
+    df = _worker_fp.load_clean_file(path)
+    if df is None:
+        return None, None, None
+    return frame_to_columns(df), _worker_fp.detection_report.get(path.name), _worker_fp.datetime_report.get(path.name)
+
+
+def resolve_workers(workers: int) -> int:
+    """0 vagy negatív érték esetén a CPU-k száma."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def load_files_parallel(fp: FileProcessor, paths: list[InputSource], workers: int) -> list[pd.DataFrame | None]:
+    """
+    Fájlok párhuzamos beolvasása; az eredmény sorrendje megegyezik a bemenetével,
+    így a DuplicateHandler 'last' stratégiája ugyanazt a sort tartja meg, mint soros futásnál.
+    """
+    workers = min(resolve_workers(workers), len(paths))
+    logging.info(f"⚙️ Párhuzamos beolvasás: {len(paths)} fájl, {workers} munkafolyamat.")
+    results = []
+    initargs = (fp.engine.name, getattr(fp.engine, "arrow_dtypes", False))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        for path, (columns, fmt, dt_stats) in zip(paths, pool.map(_ingest_worker, paths)):
+            if fmt is not None:
+                fp.detection_report[path.name] = fmt
+            if dt_stats is not None:
+                fp.datetime_report[path.name] = dt_stats
+                fp.datetime_parser.stats.add(dt_stats)
+            results.append(None if columns is None else columns_to_frame(columns))
+    return results
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# LRU GYORSÍTÓTÁR AZ AGGREGÁLT LEKÉRDEZÉSI EREDMÉNYEKHEZ
+
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class QueryCache:
+    """
+    Bájtkorlátos LRU gyorsítótár a lekérdezések eredményeihez, találat/tévesztés számlálókkal.
+
+    A kulcsban az adatkészlet verziója is szerepel, így új verzió mellett a
+    régi eredmények nem adhatnak találatot; a hívó új verzió betöltésekor
+    clear()-rel fel is szabadítja őket. Az üres eredmény (None) is tárolódik.
+    Az eredmény másolatként megy ki és jön vissza, így a hívó módosítása
+    nem rontja el a tárolt példányt.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, tuple[pd.DataFrame | None, int]] = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def size_of(df: pd.DataFrame | None) -> int:
+        return 0 if df is None else int(df.memory_usage(index=True, deep=True).sum())
+
+    def lookup(self, key: tuple) -> tuple[bool, pd.DataFrame | None]:
+        """(találat, eredmény); találatnál a bejegyzés a legutóbb használt lesz."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        df = entry[0]
+        return True, None if df is None else df.copy()
+
+    def store(self, key: tuple, df: pd.DataFrame | None) -> None:
+        """Eltárolja az eredményt; a keretnél nagyobb eredmény kimarad, a legrégebbiek kiszorulnak."""
+        size = self.size_of(df)
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        self.entries[key] = (None if df is None else df.copy(), size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
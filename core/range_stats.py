@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# IDŐSZAKOS ÖSSZEGEK ÉS SZÉLSŐÉRTÉKEK INDEXE (PREFIX-ÖSSZEG + RITKA TÁBLA)
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from column_cache import COPY_ROWS, CompactColumns
+
+# A ritka tábla blokkmérete: a blokkok szélsőértékei fölé épül a tábla, így a
+# memóriaigény n/BLOCK * log2(n/BLOCK) index, a lekérdezés pedig legfeljebb két
+# részleges blokk átnézése + két táblaolvasás.
+BLOCK = 256
+
+
+@dataclass
+class RangeTotals:
+    """Egy időszak összege, sorainak száma és az első/utolsó mérés időpontja."""
+
+    total: float
+    count: int
+    first: pd.Timestamp
+    last: pd.Timestamp
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    @property
+    def days(self) -> int:
+        """Az első és az utolsó mérés napja közötti napok száma (mindkét végét beleértve)."""
+        return (self.last.normalize() - self.first.normalize()).days + 1
+
+
+@dataclass
+class Extreme:
+    """Egy szélsőérték és az időpontja (azonos értékeknél a legkorábbi)."""
+
+    value: float
+    at: pd.Timestamp
+
+
+class SparseTable:
+    """
+    Blokkos ritka tábla egy érték-tömb [i, j) szeletének legnagyobb (vagy legkisebb) elemére.
+
+    A table[k][b] a b. blokktól kezdődő 2**k blokk szélsőértékének sorindexe;
+    egy tartomány belső blokkjait két, egymást átfedő 2**k hosszú ablak fedi
+    le, a széleken legfeljebb két részleges blokk marad. Azonos értékeknél a
+    legkisebb sorindex nyer.
+    """
+
+    def __init__(self, values: np.ndarray, largest: bool) -> None:
+        self.values = values
+        self.largest = largest
+        n = len(values)
+        blocks = -(-n // BLOCK)
+        padded = np.full(blocks * BLOCK, -np.inf if largest else np.inf, dtype="float64")
+        padded[:n] = values
+        pick = np.argmax if largest else np.argmin
+        level = pick(padded.reshape(blocks, BLOCK), axis=1) + np.arange(blocks) * BLOCK
+        self.table = [level]
+        width = 1
+        while 2 * width <= blocks:
+            a, b = level[:-width], level[width:]
+            level = np.where(self._better_or_equal(values[a], values[b]), a, b)
+            self.table.append(level)
+            width *= 2
+
+    def _better_or_equal(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return x >= y if self.largest else x <= y
+
+    def _scan(self, i: int, j: int) -> list[int]:
+        if i >= j:
+            return []
+        part = self.values[i:j]
+        return [i + int(np.argmax(part) if self.largest else np.argmin(part))]
+
+    def query(self, i: int, j: int) -> int | None:
+        """A szélsőérték sorindexe az [i, j) tartományban; None, ha üres."""
+        if i >= j:
+            return None
+        bi, bj = -(-i // BLOCK), j // BLOCK
+        if bi >= bj:
+            candidates = self._scan(i, j)
+        else:
+            k = (bj - bi).bit_length() - 1
+            level = self.table[k]
+            candidates = self._scan(i, bi * BLOCK) + [int(level[bi]), int(level[bj - (1 << k)])] + self._scan(bj * BLOCK, j)
+        candidates.sort()
+        values = self.values[candidates]
+        return candidates[int(np.argmax(values) if self.largest else np.argmin(values))]
+
+
+@dataclass
+class MeterSeries:
+    """Egy mérő (vagy az összes) időrendi sorai: időpont, kWh, kumulált összeg és a ritka táblák."""
+
+    ts: np.ndarray
+    kwh: np.ndarray
+    cum: np.ndarray
+    tables: dict[bool, SparseTable] = field(default_factory=dict)
+
+    def extreme_table(self, largest: bool) -> SparseTable:
+        if largest not in self.tables:
+            self.tables[largest] = SparseTable(self.kwh, largest)
+        return self.tables[largest]
+
+
+class RangeIndex:
+    """
+    Időszakos statisztikák az időrendbe rendezett tömör oszlopok fölött.
+
+    Az [i, j) sorok összege cum[j] - cum[i], a darabszám j - i (a kumulált
+    darabszám maga a sorindex), a minimum és a maximum (időpontjával) a
+    blokkos ritka táblából jön; a határokat két bináris keresés adja, így a
+    költség az időszak hosszától független. A mérőnkénti sorok és a ritka
+    táblák az első kérésnél készülnek el. A kumulált összeg a kwh oszlop
+    egységében halmozódik (wattóránál egész értékű, így pontos), kWh-ra csak
+    az eredmény vált.
+    """
+
+    def __init__(self, columns: CompactColumns) -> None:
+        self.columns = columns
+        self._series: dict[int | None, MeterSeries] = {}
+
+    def _index(self, meter: int | None) -> MeterSeries:
+        """Egy mérő vagy az összes sorai a kumulált összeggel; COPY_ROWS soronként számolva."""
+        if meter not in self._series:
+            ts_parts, kwh_parts = [], []
+            for lo in range(0, len(self.columns), COPY_ROWS):
+                ts = self.columns.ts[lo:lo + COPY_ROWS]
+                kwh = self.columns.kwh[lo:lo + COPY_ROWS]
+                if meter is not None:
+                    mask = self.columns.meter[lo:lo + COPY_ROWS] == meter
+                    ts, kwh = ts[mask], kwh[mask]
+                    ts_parts.append(ts)
+                kwh_parts.append(np.asarray(kwh, dtype="float64"))
+            if meter is None:
+                # az összes mérőhöz maguk a (memórialeképezett) oszlopok
+                ts, kwh = self.columns.ts, self.columns.kwh
+            else:
+                ts = np.concatenate(ts_parts) if ts_parts else self.columns.ts[:0]
+                kwh = np.concatenate(kwh_parts) if kwh_parts else np.empty(0)
+            cum = np.zeros(len(ts) + 1, dtype="float64")
+            if len(ts):
+                np.cumsum(np.concatenate(kwh_parts), out=cum[1:])
+            self._series[meter] = MeterSeries(ts, kwh, cum)
+        return self._series[meter]
+
+    def bounds(self, start=None, end=None, meter: int | None = None) -> tuple[int, int]:
+        """A [start, end] időszak sorainak [i, j) tartománya a mérő indexében."""
+        ts = self._index(meter).ts
+        i = 0 if start is None else int(np.searchsorted(ts, self.columns.ts_key(start, upper=False), side="left"))
+        j = len(ts) if end is None else int(np.searchsorted(ts, self.columns.ts_key(end, upper=True), side="right"))
+        return i, max(i, j)
+
+    def totals(self, start=None, end=None, meter: int | None = None) -> RangeTotals | None:
+        """Az időszak összege és darabszáma két kumulált értékből; None, ha nincs benne mérés."""
+        i, j = self.bounds(start, end, meter)
+        if i == j:
+            return None
+        series = self._index(meter)
+        first, last = self.columns.to_ns(series.ts[[i, j - 1]])
+        return RangeTotals(float(self.columns.to_kwh(series.cum[j] - series.cum[i])), j - i, pd.Timestamp(int(first)), pd.Timestamp(int(last)))
+
+    def extreme(self, start=None, end=None, meter: int | None = None, largest: bool = True) -> Extreme | None:
+        """Az időszak legnagyobb (largest=False esetén legkisebb) mérése és időpontja; None, ha nincs mérés."""
+        i, j = self.bounds(start, end, meter)
+        series = self._index(meter)
+        row = series.extreme_table(largest).query(i, j)
+        if row is None:
+            return None
+        at = int(self.columns.to_ns(series.ts[[row]])[0])
+        return Extreme(float(self.columns.to_kwh(series.kwh[row])), pd.Timestamp(at))
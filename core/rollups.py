@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ELŐRE ÖSSZEGZETT ÓRÁS/NAPI/HETI/HAVI VÖDRÖK (ROLLUP TÁBLÁK)
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROLLUPS_DIRNAME = "rollups"
+HEADER_FILENAME = "header.json"
+
+# Szint → (resample szabály, forrásszint). Az óra a nyers sorokból, a nap az
+# órákból, a hét és a hónap a napokból készül; a heti (W-MON) és havi (MS)
+# vödör egész napokat fog össze, így a levezetés pontos.
+ROLLUP_LEVELS = {
+    "hourly": ("h", None),
+    "daily": ("D", "hourly"),
+    "weekly": ("W-MON", "daily"),
+    "monthly": ("MS", "daily"),
+}
+
+# A vödör címkéje (ts) és mérőkódja, az összeg, a sorok száma, a legkisebb és
+# legnagyobb érték, valamint a vödör első és utolsó sorának időpontja (epoch ns).
+# Vödrönként mérőnként egy sor, a tábla (ts, meter) szerint rendezett.
+ROLLUP_DTYPE = np.dtype([
+    ("ts", "<i8"), ("meter", "<i4"), ("sum", "<f8"), ("count", "<i8"),
+    ("min", "<f8"), ("max", "<f8"), ("first", "<i8"), ("last", "<i8"),
+])
+AGGREGATIONS = {"sum": "sum", "count": "sum", "min": "min", "max": "max", "first": "min", "last": "max"}
+
+
+def raw_to_partials(df: pd.DataFrame) -> pd.DataFrame:
+    """Nyers sorok a rollup oszlopaival (minden sor egy egyelemű vödör)."""
+    ts = df['Kezdo_datum'].to_numpy(dtype="datetime64[ns]")
+    kwh = df['Hatasos_ertek_kWh'].to_numpy(dtype="float64")
+    ns = ts.view("<i8")
+    meter = df['Mero_kod'].to_numpy(dtype="int32")
+    return pd.DataFrame(
+        {"meter": meter, "sum": kwh, "count": 1, "min": kwh, "max": kwh, "first": ns, "last": ns},
+        index=pd.DatetimeIndex(ts, name="ts"),
+    )
+
+
+def rollup(partials: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Részösszegek mérőnkénti vödrökbe fogása (a resample szabály szerint); az üres vödrök kimaradnak."""
+    if partials.empty:
+        return partials
+    out = partials.groupby(["meter", pd.Grouper(freq=rule)]).agg(AGGREGATIONS)
+    out = out[out["count"] > 0].reset_index(level="meter").sort_values(["ts", "meter"])
+    return out.astype({"meter": "int32", "count": "int64", "first": "int64", "last": "int64"})
+
+
+def to_records(frame: pd.DataFrame) -> np.ndarray:
+    records = np.empty(len(frame), dtype=ROLLUP_DTYPE)
+    records["ts"] = frame.index.to_numpy(dtype="datetime64[ns]").view("<i8")
+    for name in ROLLUP_DTYPE.names[1:]:
+        records[name] = frame[name].to_numpy()
+    return records
+
+
+def to_partials_frame(records: np.ndarray) -> pd.DataFrame:
+    """Rollup rekordok részösszeg-keretként (a rollup() bemenete)."""
+    index = pd.DatetimeIndex(records["ts"].view("datetime64[ns]"), name="ts")
+    return pd.DataFrame({name: records[name] for name in ROLLUP_DTYPE.names[1:]}, index=index)
+
+
+def bucket_label(level: str, ts) -> pd.Timestamp:
+    """Az időpontot tartalmazó vödör címkéje (a resample szabály szerint)."""
+    ts = pd.Timestamp(ts)
+    if level == "hourly":
+        return ts.floor("h")
+    day = ts.normalize()
+    if level == "daily":
+        return day
+    if level == "weekly":
+        # W-MON: a hét keddtől hétfőig tart, a címke a záró hétfő
+        return day + pd.Timedelta(days=-day.weekday() % 7)
+    return day.replace(day=1)
+
+
+def bucket_span(level: str, label: pd.Timestamp) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """A vödör által lefedett [kezdet, vég) időszak a címkéje alapján."""
+    if level == "hourly":
+        return label, label + pd.Timedelta(hours=1)
+    if level == "daily":
+        return label, label + pd.Timedelta(days=1)
+    if level == "weekly":
+        return label - pd.Timedelta(days=6), label + pd.Timedelta(days=1)
+    return label, label + pd.offsets.MonthBegin(1)
+
+
+def affected_window(lo, hi) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """A [lo, hi] változást tartalmazó összes vödröt lefedő [kezdet, vég) időszak."""
+    starts = [bucket_span(level, bucket_label(level, lo))[0] for level in ROLLUP_LEVELS]
+    ends = [bucket_span(level, bucket_label(level, hi))[1] for level in ROLLUP_LEVELS]
+    return min(starts), max(ends)
+
+
+class RollupCache:
+    """
+    Szintenként egy rendezett .npy tábla a vödrök összegével, darabszámával, minimumával és maximumával.
+
+    A feldolgozó minden új adatkészlet-verziónál frissíti: teljes
+    újraépítéskor a tároló egyszeri végigolvasásával, inkrementális futásnál
+    csak a változást tartalmazó vödrök újraszámolásával. A GUI a durva
+    intervallumokat ezekből válaszolja meg, a nyers sorok olvasása nélkül.
+    """
+
+    VERSION = 2
+
+    def __init__(self, output_dir: Path) -> None:
+        self.root = output_dir / ROLLUPS_DIRNAME
+        self.header: dict | None = None
+        self.tables: dict[str, np.ndarray] = {}
+
+    def _path(self, level: str) -> Path:
+        return self.root / f"{level}.npy"
+
+    def open(self, dataset_version: int | None = None) -> bool:
+        """Megnyitja a táblákat; hamis, ha hiányoznak vagy nem az aktuális adatkészlethez tartoznak."""
+        self.header, self.tables = None, {}
+        header_path = self.root / HEADER_FILENAME
+        if not header_path.exists():
+            return False
+        try:
+            header = json.loads(header_path.read_text(encoding="utf-8"))
+            if header.get("version") != self.VERSION:
+                return False
+            if dataset_version is not None and header.get("dataset_version") != dataset_version:
+                return False
+            tables = {level: np.load(self._path(level), mmap_mode="r") for level in ROLLUP_LEVELS}
+        except Exception as e:
+            logging.warning(f"⚠️ Az összesítő táblák nem nyithatók meg ({e}): {self.root}")
+            return False
+        self.header, self.tables = header, tables
+        return True
+
+    @staticmethod
+    def _derive(hourly: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        """Az összes szint az órás vödrökből, a forrásszintek sorrendjében."""
+        frames = {"hourly": hourly}
+        for level, (rule, source) in ROLLUP_LEVELS.items():
+            if source is not None:
+                frames[level] = rollup(frames[source], rule)
+        return frames
+
+    def build(self, frames, dataset_version: int, store_name: str) -> int:
+        """
+        Teljes újraépítés az időrendben érkező darabokból.
+
+        A darabonkénti órás részösszegek egy második összevonással válnak
+        pontossá (egy óra két darab határára is eshet); a memóriaigény az órák
+        számával arányos, nem a nyers sorokéval.
+        """
+        hourly_rule = ROLLUP_LEVELS["hourly"][0]
+        partials = [rollup(raw_to_partials(df), hourly_rule) for df in frames if not df.empty]
+        hourly = rollup(pd.concat(partials), hourly_rule) if partials else to_partials_frame(np.empty(0, dtype=ROLLUP_DTYPE))
+        tables = {level: to_records(frame) for level, frame in self._derive(hourly).items()}
+        self._save(tables, dataset_version, store_name)
+        return len(tables["hourly"])
+
+    def update(self, store, dataset_version: int, changed: tuple[pd.Timestamp, pd.Timestamp] | None) -> str:
+        """
+        A táblák frissítése az új adatkészlet-verzióhoz; a visszatérési érték a frissítés módja.
+
+        Ha a változás időszaka ismert és az előző verzió táblái megvannak,
+        csak az ezt fedő vödrök számolódnak újra a tároló szeletéből; egyébként
+        teljes újraépítés történik.
+        """
+        if changed is None or not self.open(dataset_version - 1):
+            self.build(store.iter_frames(), dataset_version, store.name)
+            return "full"
+        window_start, window_end = affected_window(*changed)
+        df = store.read(window_start, window_end - pd.Timedelta(1, "ns"))
+        fresh = self._derive(rollup(raw_to_partials(df), ROLLUP_LEVELS["hourly"][0]))
+        tables = {}
+        for level in ROLLUP_LEVELS:
+            old = np.asarray(self.tables[level])
+            # Csak a változást tartalmazó vödrök cserélődnek: az ablak szélein
+            # lévő (csonkán beolvasott) vödrök a régi értéküket tartják meg.
+            lo, hi = bucket_label(level, changed[0]).value, bucket_label(level, changed[1]).value
+            new = to_records(fresh[level])
+            new = new[(new["ts"] >= lo) & (new["ts"] <= hi)]
+            outside = old[(old["ts"] < lo) | (old["ts"] > hi)]
+            merged = np.concatenate([outside, new])
+            tables[level] = merged[np.lexsort((merged["meter"], merged["ts"]))]
+        self._save(tables, dataset_version, store.name)
+        return "incremental"
+
+    def _save(self, tables: dict[str, np.ndarray], dataset_version: int, store_name: str) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        for level, records in tables.items():
+            tmp_path = self.root / f"{level}.npy.tmp"
+            with open(tmp_path, "wb") as fh:
+                np.save(fh, records)
+            os.replace(tmp_path, self._path(level))
+        header = {
+            "version": self.VERSION,
+            "levels": {level: len(records) for level, records in tables.items()},
+            "dataset_version": dataset_version,
+            "store": store_name,
+        }
+        tmp_header = self.root / (HEADER_FILENAME + ".tmp")
+        tmp_header.write_text(json.dumps(header, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_header, self.root / HEADER_FILENAME)
+        self.header, self.tables = header, tables
+
+    def sums(self, level: str, start, end, meter: int | None = None) -> pd.Series | None:
+        """
+        A [start, end] időszak vödör-összegei a szint táblájából (egy mérőé vagy az összesé).
+
+        A teljes egészében az időszakba eső vödrök a szint saját táblájából
+        jönnek; a szélső, csonka vödör (amelynek van az időszakon kívüli sora,
+        pl. hónap közepén kezdődő havi nézet) a forrásszintből, csak a lefedett
+        részre számolódik újra, rekurzívan (hónap/hét → nap → óra). None, ha egy
+        csonka órás vödörhöz a nyers sorok kellenének.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        records = self.tables[level]
+        lo, hi = start.value, end.value
+        i = int(np.searchsorted(records["ts"], bucket_label(level, start).value, side="left"))
+        j = int(np.searchsorted(records["ts"], bucket_label(level, end).value, side="right"))
+        window = np.asarray(records[i:j])
+        if meter is not None:
+            window = window[window["meter"] == meter]
+        if len(window) == 0:
+            return pd.Series(dtype="float64", name='Hatasos_ertek_kWh')
+        # A tábla (ts, meter) szerint rendezett: a mérők vödreinek összege címkénként
+        labels, starts = np.unique(window["ts"], return_index=True)
+        values = np.add.reduceat(window["sum"], starts)
+        keep = np.ones(len(labels), dtype=bool)
+        partial = np.unique(window["ts"][(window["first"] < lo) | (window["last"] > hi)])
+        source = ROLLUP_LEVELS[level][1]
+        for label in partial:
+            if source is None:
+                return None
+            span_start, span_end = bucket_span(level, pd.Timestamp(label))
+            inner = self.sums(source, max(span_start, start), min(span_end - pd.Timedelta(1, "ns"), end), meter)
+            if inner is None:
+                return None
+            k = int(np.searchsorted(labels, label))
+            if inner.empty:
+                keep[k] = False
+            else:
+                values[k] = inner.sum()
+        index = pd.DatetimeIndex(labels[keep].view("datetime64[ns]"), name='Kezdo_datum')
+        return pd.Series(values[keep], index=index, name='Hatasos_ertek_kWh')
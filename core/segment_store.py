@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# CSAK HOZZÁFŰZŐ, MEGVÁLTOZTATHATATLAN SZEGMENSEK TÖMÖRÍTÉSSEL
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from meter_registry import METER_DTYPE
+
+SEGMENTS_DIRNAME = "energia_adatok.segments"
+SEGMENT_DTYPE = np.dtype([("ts", "<i8"), ("meter", "<i4"), ("kwh", "<f8")])  # ts: epoch nanoszekundum (faliórás idő)
+MAX_SEGMENTS = 8          # ennél több szegmens után automatikus tömörítés
+SMALL_SEGMENT_RATIO = 0.25  # a legnagyobb szegmenshez mérten ennél kisebb szegmens "kicsi"
+
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """Időpont, azon belül mérőkód szerint (stabilan) rendezett rekordtömb egy adatkeretből."""
+    records = np.empty(len(df), dtype=SEGMENT_DTYPE)
+    records["ts"] = df['Kezdo_datum'].to_numpy(dtype="datetime64[ns]").view("<i8")
+    records["meter"] = df['Mero_kod'].to_numpy()
+    records["kwh"] = df['Hatasos_ertek_kWh'].to_numpy(dtype="float64")
+    return records[np.lexsort((records["meter"], records["ts"]))]
+
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Kezdo_datum': np.ascontiguousarray(records["ts"]).view("datetime64[ns]"),
+        'Mero_kod': np.ascontiguousarray(records["meter"], dtype=METER_DTYPE),
+        'Hatasos_ertek_kWh': np.ascontiguousarray(records["kwh"]),
+    })
+
+
+def merge_newest_wins(parts: list[np.ndarray]) -> np.ndarray:
+    """
+    Szegmens-szeletek összefésülése régebbitől újabbig megadott sorrendben.
+
+    Ütköző (időpont, mérő) kulcsnál az újabb szegmens sora marad (mint a
+    merge_with_existing-nél), az eredmény időpont, azon belül mérő szerint
+    rendezett.
+    """
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return np.empty(0, dtype=SEGMENT_DTYPE)
+    if len(parts) == 1:
+        return np.array(parts[0])
+    merged = np.concatenate([np.asarray(part) for part in parts])
+    age = np.repeat(np.arange(len(parts))[::-1], [len(part) for part in parts])  # 0 = legújabb
+    merged = merged[np.lexsort((age, merged["meter"], merged["ts"]))]
+    first = np.ones(len(merged), dtype=bool)
+    first[1:] = (merged["ts"][1:] != merged["ts"][:-1]) | (merged["meter"][1:] != merged["meter"][:-1])
+    return merged[first]
+
+
+class SegmentStore:
+    """
+    Csak hozzáfűző tároló: minden betöltés egy kis, rendezett, megváltoztathatatlan szegmenst ír.
+
+    Az írási költség így az új adatok méretével arányos, nem a teljes
+    előzménnyel. Az olvasó a szegmenseket memóriába leképezve, bináris
+    kereséssel szeleteli és fésüli össze; a tömörítés a kis szegmenseket
+    nagyobbakba olvasztja, és közben alkalmazza a duplikáció-szűrést.
+    """
+
+    name = "segments"
+    pushdown = False
+    VERSION = 2
+
+    def __init__(self, output_dir: Path, max_segments: int = MAX_SEGMENTS, fp=None) -> None:
+        self.root = output_dir / SEGMENTS_DIRNAME
+        self.meta_path = self.root / "segments.json"
+        self.fp = fp  # írás előtti biztonsági mentéshez; olvasáshoz nem kell
+        self.max_segments = max_segments
+        self.segments: list[dict] = []
+        self.next_seq = 1
+        self.load_meta()
+
+    @property
+    def location(self) -> Path:
+        return self.root
+
+    def exists(self) -> bool:
+        return self.meta_path.exists()
+
+    def load_meta(self) -> None:
+        if not self.exists():
+            return
+        try:
+            raw = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if raw.get("version") == self.VERSION:
+                self.segments = sorted(raw.get("segments", []), key=lambda s: s["seq"])
+                self.next_seq = int(raw.get("next_seq", 1))
+        except Exception as e:
+            logging.warning(f"⚠️ A szegmens-nyilvántartás nem olvasható ({e}): {self.meta_path}")
+            self.segments = []
+
+    def save_meta(self) -> None:
+        payload = {"version": self.VERSION, "next_seq": self.next_seq, "segments": self.segments}
+        tmp_path = self.meta_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.meta_path)
+
+    def backup(self, reason: str = "write") -> None:
+        """A szegmensek mentése módosítás előtt; a változatlan szegmensfájlok nem foglalnak új helyet."""
+        if self.fp is not None:
+            self.fp.backup_file(self.root, reason)
+
+    def _write_segment(self, records: np.ndarray) -> dict:
+        """Új szegmensfájl (még nyilvántartás nélkül); a leírója a hívóé."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        seq = self.next_seq
+        self.next_seq += 1
+        filename = f"seg_{seq:08d}.npy"
+        tmp_path = self.root / (filename + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, records)
+        os.replace(tmp_path, self.root / filename)
+        return {"seq": seq, "file": filename, "rows": len(records), "ts_min": int(records["ts"][0]), "ts_max": int(records["ts"][-1])}
+
+    def _remove_files(self, segments: list[dict]) -> None:
+        for segment in segments:
+            (self.root / segment["file"]).unlink(missing_ok=True)
+
+    def _prune(self) -> None:
+        """A nyilvántartásban nem szereplő szegmensfájlok törlése (pl. elavult formátumú előzmények)."""
+        referenced = {segment["file"] for segment in self.segments}
+        for path in self.root.glob("seg_*.npy"):
+            if path.name not in referenced:
+                path.unlink()
+
+    def _open(self, segment: dict) -> np.ndarray:
+        return np.load(self.root / segment["file"], mmap_mode="r")
+
+    def _slices(self, lo: int | None, hi: int | None) -> list[np.ndarray]:
+        """Az átfedő szegmensek [lo, hi] szeletei, régebbitől újabbig."""
+        parts = []
+        for segment in self.segments:
+            if (lo is not None and segment["ts_max"] < lo) or (hi is not None and segment["ts_min"] > hi):
+                continue
+            records = self._open(segment)
+            start = 0 if lo is None else int(np.searchsorted(records["ts"], lo, side="left"))
+            end = len(records) if hi is None else int(np.searchsorted(records["ts"], hi, side="right"))
+            parts.append(records[start:end])
+        return parts
+
+    def read(self, start=None, end=None) -> pd.DataFrame | None:
+        if not self.exists():
+            return None
+        lo = None if start is None else pd.Timestamp(start).value
+        hi = None if end is None else pd.Timestamp(end).value
+        return records_to_frame(merge_newest_wins(self._slices(lo, hi)))
+
+    def iter_frames(self, chunksize: int = 100_000):
+        """A teljes adatkészlet időrendben, havi szeletekben (korlátos memóriával)."""
+        bounds = self.bounds()
+        if bounds is None:
+            return
+        for month_start in pd.date_range(bounds[0].to_period('M').to_timestamp(), bounds[1], freq="MS"):
+            month_end = month_start + pd.offsets.MonthBegin(1) - pd.Timedelta(1, "ns")
+            df = self.read(month_start, month_end)
+            if not df.empty:
+                yield df
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        if not self.segments:
+            return None
+        return (
+            pd.Timestamp(min(s["ts_min"] for s in self.segments)),
+            pd.Timestamp(max(s["ts_max"] for s in self.segments)),
+        )
+
+    def write(self, df: pd.DataFrame) -> bool:
+        """Teljes újraépítés: egyetlen alap szegmens, a korábbiak törlődnek."""
+        try:
+            self.backup()
+            self.segments = [self._write_segment(frame_to_records(df))] if len(df) else []
+            self.save_meta()
+            self._prune()
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.root}' tárolónál: {e}")
+            return False
+
+    def merge(self, new_df: pd.DataFrame) -> bool:
+        """Új adatok: egy új szegmens; a meglévők érintetlenek maradnak."""
+        try:
+            self.backup()
+            if len(new_df):
+                self.segments.append(self._write_segment(frame_to_records(new_df)))
+                self.save_meta()
+            logging.info(f"Új szegmens hozzáfűzve: {len(new_df)} sor ({len(self.segments)} szegmens összesen).")
+            self.compact_if_needed()
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.root}' tárolónál: {e}")
+            return False
+
+    def existing_chunks(self, months: set[str], chunksize: int):
+        """Darabolt módban nincs szükség a meglévő adatokra: az olvasó fésüli össze a szegmenseket."""
+        return iter(())
+
+    @contextmanager
+    def month_writer(self, replace: bool):
+        """Hónaponként egy szegmens; a nyilvántartás csak a végén, egyszerre frissül."""
+        self.backup()
+        written = []
+        yield lambda month_df: written.append(self._write_segment(frame_to_records(month_df)))
+        self.segments = ([] if replace else self.segments) + written
+        self.save_meta()
+        if replace:
+            self._prune()
+        else:
+            self.compact_if_needed()
+
+    def compact(self, full: bool = False, backup: bool = True) -> int:
+        """
+        Szegmensek összeolvasztása duplikáció-szűréssel; a visszatérési érték az összevont szegmensek száma.
+
+        Alapesetben csak a legutóbbi nagy szegmens utáni kis szegmensek
+        olvadnak össze (a sorrend így megmarad), full=True esetén minden.
+        Írás utáni automatikus tömörítésnél (backup=False) az írás előtti mentés elég.
+        """
+        if full:
+            run = list(self.segments)
+        else:
+            largest = max((s["rows"] for s in self.segments), default=0)
+            run = []
+            for segment in reversed(self.segments):
+                if segment["rows"] >= SMALL_SEGMENT_RATIO * largest and run:
+                    break
+                run.insert(0, segment)
+                if segment["rows"] >= SMALL_SEGMENT_RATIO * largest:
+                    break
+        if len(run) < 2:
+            return 0
+        if backup:
+            self.backup()
+        merged = merge_newest_wins([self._open(s) for s in run])
+        replacement = self._write_segment(merged)
+        keep = [s for s in self.segments if s not in run]
+        self.segments = sorted(keep + [replacement], key=lambda s: s["seq"])
+        self.save_meta()
+        self._remove_files(run)
+        removed = sum(s["rows"] for s in run) - len(merged)
+        logging.info(f"🧱 Szegmens-tömörítés: {len(run)} szegmens → 1 ({len(merged)} sor, {removed} felülírt sor kiszűrve).")
+        return len(run)
+
+    def compact_if_needed(self) -> None:
+        if len(self.segments) > self.max_segments:
+            self.compact(backup=False)
+        if len(self.segments) > self.max_segments:
+            self.compact(full=True, backup=False)
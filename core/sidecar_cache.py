@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# FÁJLONKÉNTI NORMALIZÁLT GYORSÍTÓTÁR (TARTALOM-HASH + NORMALIZÁLÁSI VERZIÓ)
+
+import json
+import logging
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+SIDECARS_DIRNAME = "sidecars"
+META_FILENAME = "meta.json"
+
+
+class SidecarCache:
+    """
+    Egy sikeresen normalizált forrásfájl típusos (pickle) másolata, darabokban.
+
+    A kulcs a kibontott tartalom SHA-256 lenyomata és a normalizálás verziója,
+    így átnevezett vagy újra letöltött, de azonos tartalmú fájl is találat,
+    a normalizálás változásakor pedig minden bejegyzés érvényét veszti. Egy
+    bejegyzés könyvtár: meta.json (a felismert formátum) és part_NNNNN.pkl
+    darabok; az írás ideiglenes könyvtárba történik, és csak a teljes fájl
+    feldolgozása után kerül a helyére.
+    """
+
+    def __init__(self, output_dir: Path, version: str) -> None:
+        self.root = output_dir / SIDECARS_DIRNAME
+        self.version = version
+
+    def key(self, sha256: str) -> str:
+        return f"{sha256}.{self.version}"
+
+    def _entry(self, sha256: str) -> Path:
+        return self.root / self.key(sha256)
+
+    def meta(self, sha256: str) -> dict | None:
+        """A bejegyzés leírója; None, ha nincs (vagy sérült) találat."""
+        path = self._entry(sha256) / META_FILENAME
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logging.warning(f"⚠️ Sérült gyorsítótár-bejegyzés, újraolvasás ({e}): {path.parent.name}")
+            return None
+
+    def iter_parts(self, sha256: str):
+        """A bejegyzés darabjai az eredeti sorrendben."""
+        for part in sorted(self._entry(sha256).glob("part_*.pkl")):
+            yield pd.read_pickle(part)
+
+    def read(self, sha256: str) -> pd.DataFrame:
+        parts = list(self.iter_parts(sha256))
+        return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    @contextmanager
+    def writer(self, sha256: str, meta: dict):
+        """
+        Darabonkénti írás egy új bejegyzésbe; a with blokk hibátlan lefutásakor kerül a helyére.
+
+        A yield-elt függvény egy darabot fűz hozzá. Kivétel vagy félbehagyott
+        feldolgozás esetén az ideiglenes könyvtár törlődik; az írási hiba
+        (pl. betelt lemez) csak figyelmeztetés, a feldolgozás folytatódik.
+        """
+        target = self._entry(sha256)
+        tmp_dir = target.with_name(target.name + ".tmp")
+        state = {"parts": 0, "rows": 0, "failed": False}
+
+        def fail(e: Exception) -> None:
+            state["failed"] = True
+            logging.warning(f"⚠️ A normalizált gyorsítótár nem írható ({e}): {target.name}")
+
+        def add_part(df: pd.DataFrame) -> None:
+            if state["failed"]:
+                return
+            try:
+                df.to_pickle(tmp_dir / f"part_{state['parts']:05d}.pkl")
+            except Exception as e:
+                fail(e)
+                return
+            state["parts"] += 1
+            state["rows"] += len(df)
+
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+        except Exception as e:
+            fail(e)
+        try:
+            yield add_part
+            if not state["failed"]:
+                try:
+                    payload = {**meta, "parts": state["parts"], "rows": state["rows"]}
+                    (tmp_dir / META_FILENAME).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                    shutil.rmtree(target, ignore_errors=True)
+                    tmp_dir.rename(target)
+                except Exception as e:
+                    fail(e)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def prune(self, keep_hashes: set[str]) -> int:
+        """A meg nem tartandó (eltűnt fájlok, régi verzió, félbehagyott írás) bejegyzések törlése."""
+        if not self.root.exists():
+            return 0
+        keep = {self.key(sha256) for sha256 in keep_hashes}
+        removed = 0
+        for entry in self.root.iterdir():
+            if entry.name not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        if removed:
+            logging.info(f"🧹 Normalizált gyorsítótár: {removed} elavult bejegyzés törölve.")
+        return removed
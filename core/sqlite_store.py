@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# BEÁGYAZOTT SQLITE IDŐSOR-TÁROLÓ
+
+import logging
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from meter_registry import METER_DTYPE
+
+SQLITE_FILENAME = "energia_adatok.sqlite"
+
+# Az időpont egész másodperc (a faliórás idő epoch-kódolva, időzóna nélkül),
+# a mérő a mérő-szótár kódja (Mero_kod). A (meter, ts) kulcs mérőnkénti, a ts index
+# a mérőkön átívelő időszak-lekérdezéseket szolgálja ki.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    meter INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    kwh REAL,
+    PRIMARY KEY (meter, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings (ts);
+"""
+
+UPSERT_SQL = "INSERT INTO readings (meter, ts, kwh) VALUES (?, ?, ?) ON CONFLICT (meter, ts) DO UPDATE SET kwh = excluded.kwh"
+
+def to_epoch_seconds(values: pd.Series) -> pd.Series:
+    return values.astype("int64") // 10**9
+
+
+def from_epoch_seconds(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, unit="s")
+
+
+def to_frame(ts: pd.Series, meter: pd.Series, kwh: pd.Series) -> pd.DataFrame:
+    """Lekérdezés eredménye a tárolók közös oszlopaival."""
+    return pd.DataFrame({
+        'Kezdo_datum': from_epoch_seconds(ts),
+        'Mero_kod': meter.astype(METER_DTYPE),
+        'Hatasos_ertek_kWh': kwh.astype("float64"),
+    })
+
+
+class SqliteStore:
+    """
+    Egyetlen SQLite adatbázis WAL naplózással.
+
+    Az írás tranzakcióban, executemany upserttel történik, így az olvasók
+    (GUI, más eszközök) írás közben is a legutóbbi teljes állapotot látják.
+    Az időszak-szűrés és a vödrönkénti összegzés SQL-ben fut (pushdown).
+    """
+
+    name = "sqlite"
+    pushdown = True
+
+    def __init__(self, output_dir: Path, fp=None) -> None:
+        self.path = output_dir / SQLITE_FILENAME
+        self.fp = fp  # írás előtti biztonsági mentéshez; olvasáshoz nem kell
+
+    @property
+    def location(self) -> Path:
+        return self.path
+
+    def exists(self) -> bool:
+        if not self.path.exists():
+            return False
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'readings'").fetchone() is not None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def backup(self, reason: str = "write") -> None:
+        """
+        Az adatbázisfájl mentése írás előtt.
+
+        Előbb a WAL tartalma visszaíródik a fő fájlba (és a WAL kiürül), így
+        a mentés egymagában teljes; a változatlan szeletek nem foglalnak új helyet.
+        """
+        if self.fp is None or not self.path.exists():
+            return
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.fp.backup_file(self.path, reason)
+
+    @staticmethod
+    def _rows(df: pd.DataFrame):
+        meter = df['Mero_kod'].astype("int64").tolist()
+        ts = to_epoch_seconds(df['Kezdo_datum']).tolist()
+        kwh = df['Hatasos_ertek_kWh'].astype("float64").tolist()
+        return zip(meter, ts, kwh)
+
+    @staticmethod
+    def _range_args(start, end) -> tuple[int, int]:
+        lo = -(2**62) if start is None else int(pd.Timestamp(start).value // 10**9)
+        hi = 2**62 if end is None else int(pd.Timestamp(end).value // 10**9)
+        return lo, hi
+
+    def read(self, start=None, end=None) -> pd.DataFrame | None:
+        """Az időszak sorai a ts indexen keresztül."""
+        if not self.exists():
+            return None
+        with closing(sqlite3.connect(self.path)) as conn:
+            df = pd.read_sql_query(
+                "SELECT ts, meter, kwh FROM readings WHERE ts BETWEEN ? AND ? ORDER BY ts, meter",
+                conn,
+                params=self._range_args(start, end),
+            )
+        return to_frame(df['ts'], df['meter'], df['kwh'])
+
+    def iter_frames(self, chunksize: int = 100_000):
+        """A teljes adatkészlet időrendben, darabonként; hiányzó adatbázisnál üres (és nem is jön létre)."""
+        if not self.exists():
+            return
+        with closing(sqlite3.connect(self.path)) as conn:
+            for df in pd.read_sql_query("SELECT ts, meter, kwh FROM readings ORDER BY ts, meter", conn, chunksize=chunksize):
+                yield to_frame(df['ts'], df['meter'], df['kwh'])
+
+    def aggregate(self, start, end, bucket_seconds: int, meter: int | None = None) -> pd.DataFrame:
+        """
+        Vödrönkénti összeg SQL-ben: csak a vödrök száma jön át pandasba, nem a nyers sorok.
+
+        Mérő megadásakor a (meter, ts) kulcson szűr, egyébként az összes mérő összege.
+        """
+        if not self.exists():
+            return pd.DataFrame({'Kezdo_datum': pd.Series(dtype="datetime64[ns]"), 'Hatasos_ertek_kWh': pd.Series(dtype="float64")})
+        where, params = "ts BETWEEN ? AND ?", list(self._range_args(start, end))
+        if meter is not None:
+            where, params = "meter = ? AND " + where, [int(meter)] + params
+        with closing(sqlite3.connect(self.path)) as conn:
+            df = pd.read_sql_query(
+                f"SELECT ts - (ts % ?) AS bucket, SUM(kwh) AS kwh FROM readings WHERE {where} GROUP BY bucket ORDER BY bucket",
+                conn,
+                params=[bucket_seconds] + params,
+            )
+        return pd.DataFrame({'Kezdo_datum': from_epoch_seconds(df['bucket']), 'Hatasos_ertek_kWh': df['kwh'].astype("float64")})
+
+    def bounds(self) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        if not self.exists():
+            return None
+        with closing(sqlite3.connect(self.path)) as conn:
+            lo, hi = conn.execute("SELECT MIN(ts), MAX(ts) FROM readings").fetchone()
+        if lo is None:
+            return None
+        return pd.Timestamp(lo, unit="s"), pd.Timestamp(hi, unit="s")
+
+    def write(self, df: pd.DataFrame) -> bool:
+        """A teljes adatkészlet cseréje egyetlen tranzakcióban."""
+        try:
+            self.backup()
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM readings")
+                conn.executemany(UPSERT_SQL, self._rows(df))
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.path}' adatbázisnál: {e}")
+            return False
+
+    def merge(self, new_df: pd.DataFrame) -> bool:
+        """Új adatok upsertje: ütköző időpontnál az újabb export értéke nyer."""
+        try:
+            self.backup()
+            with closing(self._connect()) as conn, conn:
+                before = conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+                conn.executemany(UPSERT_SQL, self._rows(new_df))
+                after = conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+            logging.info(f"Meglévő adatkészlethez fűzve: {before} → {after} sor.")
+            return True
+        except Exception as e:
+            logging.error(f"❌ Mentési hiba a(z) '{self.path}' adatbázisnál: {e}")
+            return False
+
+    def existing_chunks(self, months: set[str], chunksize: int):
+        """Darabolt módban nincs szükség a meglévő adatokra: az upsert fésüli össze őket."""
+        return iter(())
+
+    @contextmanager
+    def month_writer(self, replace: bool):
+        """Hónaponkénti upsert egyetlen tranzakcióban; teljes újraépítésnél előbb ürít."""
+        self.backup()
+        with closing(self._connect()) as conn, conn:
+            if replace:
+                conn.execute("DELETE FROM readings")
+            yield lambda month_df: conn.executemany(UPSERT_SQL, self._rows(month_df))
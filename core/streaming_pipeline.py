@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# DARABOLT (STREAMING) FELDOLGOZÁS NAGY EXPORTOKHOZ
+
+import logging
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from dataset_store import SORT_COLUMNS, output_frame
+from duplicate_handler import DuplicateHandler, merge_with_existing
+from file_processor import FileProcessor
+from input_sources import InputSource
+
+
+@dataclass
+class FileStreamStats:
+    """Egy forrásfájl darabolt feldolgozásának összesítése (a manifeszthez)."""
+
+    row_count: int = 0
+    date_start: pd.Timestamp | None = None
+    date_end: pd.Timestamp | None = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        self.row_count += len(chunk)
+        lo, hi = chunk['Kezdo_datum'].min(), chunk['Kezdo_datum'].max()
+        self.date_start = lo if self.date_start is None else min(self.date_start, lo)
+        self.date_end = hi if self.date_end is None else max(self.date_end, hi)
+
+
+@dataclass
+class StreamingResult:
+    """A darabolt futás eredménye."""
+
+    file_stats: dict[InputSource, FileStreamStats] = field(default_factory=dict)
+    initial_count: int = 0
+    final_count: int = 0
+    output_rows: int = 0
+
+
+class StreamingPipeline:
+    """
+    Korlátos memóriájú feldolgozás: darab → normalizálás → típusosítás → havi spool → duplikáció-szűrés → kimenet.
+
+    A duplikáció-kulcs minden eleme tartalmazza a Kezdo_datum-ot, ezért a hónap
+    szerinti szétválogatás után a hónapok egymástól függetlenül szűrhetők; a
+    csúcsmemória így a darabmérettől és egy hónap adatától függ, nem a teljes
+    előzménytől. A darabok sorszámozott spool fájlokba kerülnek, így a 'last'
+    stratégia ugyanazt a sort tartja meg, mint a teljes beolvasásnál.
+    """
+
+    def __init__(self, fp: FileProcessor, dh: DuplicateHandler, chunksize: int = 100_000) -> None:
+        self.fp = fp
+        self.dh = dh
+        self.chunksize = chunksize
+
+    def run(self, paths: list[InputSource], store, incremental: bool = False) -> StreamingResult:
+        """Feldolgozza a fájlokat a tárolóba; inkrementális módban a meglévő adatokhoz fűz."""
+        result = StreamingResult()
+        with tempfile.TemporaryDirectory(prefix="spool_", dir=self.fp.output_dir) as spool_root:
+            spool_dir = Path(spool_root)
+            piece_no = 0
+            for path in paths:
+                stats = result.file_stats.setdefault(path, FileStreamStats())
+                for chunk in self.fp.iter_clean_chunks(path, self.chunksize):
+                    stats.update(chunk)
+                    piece_no = self._spool(chunk, spool_dir / "new", piece_no)
+            if incremental:
+                new_months = {p.name for p in (spool_dir / "new").glob("*")}
+                for chunk in store.existing_chunks(new_months, self.chunksize):
+                    piece_no = self._spool(chunk, spool_dir / "existing", piece_no)
+
+            months = sorted({p.name for p in spool_dir.glob("*/*")})
+            if not months:
+                return result
+            with store.month_writer(replace=not incremental) as write_month:
+                for month in months:
+                    month_df = self._merge_month(spool_dir, month, result)
+                    write_month(month_df)
+                    result.output_rows += len(month_df)
+        return result
+
+    def _spool(self, chunk: pd.DataFrame, target_dir: Path, piece_no: int) -> int:
+        """A darabot hónapok szerint szétosztja; a sorszám őrzi az érkezési sorrendet."""
+        for period, part in chunk.groupby(chunk['Kezdo_datum'].dt.to_period('M'), sort=False):
+            month_dir = target_dir / str(period)
+            month_dir.mkdir(parents=True, exist_ok=True)
+            part.to_pickle(month_dir / f"{piece_no:08d}.pkl")
+            piece_no += 1
+        return piece_no
+
+    def _merge_month(self, spool_dir: Path, month: str, result: StreamingResult) -> pd.DataFrame:
+        """Egy hónap darabjainak szűrése és összefésülése a meglévő adatokkal."""
+        new_df = self._read_pieces(spool_dir / "new" / month)
+        if new_df is not None:
+            result.initial_count += len(new_df)
+            new_df = output_frame(self.dh.remove_duplicates(new_df, keep_strategy='last', detailed_logging=False), self.fp.meters)
+            result.final_count += len(new_df)
+        existing_df = self._read_pieces(spool_dir / "existing" / month)
+        if existing_df is None:
+            month_df = new_df
+        elif new_df is None:
+            month_df = existing_df
+        else:
+            month_df = merge_with_existing(existing_df, new_df)
+        return month_df.sort_values(by=SORT_COLUMNS, kind="mergesort").reset_index(drop=True)
+
+    @staticmethod
+    def _read_pieces(month_dir: Path) -> pd.DataFrame | None:
+        pieces = sorted(month_dir.glob("*.pkl"))
+        if not pieces:
+            return None
+        df = pd.concat([pd.read_pickle(piece) for piece in pieces], ignore_index=True)
+        for piece in pieces:
+            piece.unlink()
+        return df
+
+
+def log_streaming_result(result: StreamingResult) -> None:
+    """Összesítő napló a darabolt futásról."""
+    removed = result.initial_count - result.final_count
+    logging.info(f"Darabolt feldolgozás: {result.initial_count} beolvasott sor, duplikáció-szűrés után {result.final_count} (eltávolítva: {removed}).")
+    logging.info(f"Kimenet: {result.output_rows} sor.")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# FIGYELŐ DÉMON: ÚJ EXPORTOK AUTOMATIKUS FELDOLGOZÁSA (WATCHDOG)
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from file_processor import FileProcessor
+
+
+class PendingFiles:
+    """Szálbiztos gyűjtő a még fel nem dolgozott fájleseményekhez."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._files: dict[Path, tuple[int, int] | None] = {}
+        self.last_event = 0.0
+
+    def touch(self, path: Path) -> None:
+        with self._lock:
+            self._files[path] = None
+            self.last_event = time.monotonic()
+
+    def take_ready(self, settle_seconds: float, batch_window: float) -> list[Path]:
+        """
+        Visszaadja a köteget, ha minden függő fájl befejezettnek tűnik.
+
+        Befejezett az a fájl, amelynek mérete és mtime-ja két egymást követő
+        ellenőrzésnél azonos, és legalább settle_seconds óta nem módosult. A
+        köteg csak batch_window csend után indul, így egy egyszerre bemásolt
+        fájlcsomag egyetlen feldolgozást vált ki.
+        """
+        with self._lock:
+            if not self._files or time.monotonic() - self.last_event < batch_window:
+                return []
+            all_settled = True
+            for path in list(self._files):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    del self._files[path]  # közben törölték vagy átnevezték
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                settled = self._files[path] == signature and time.time() - stat.st_mtime >= settle_seconds
+                self._files[path] = signature
+                all_settled = all_settled and settled
+            if not all_settled:
+                return []
+            batch = sorted(self._files)
+            self._files.clear()
+            return batch
+
+
+class IngestEventHandler(FileSystemEventHandler):
+    """A bemeneti mappa eseményeiből a feldolgozható fájlokat gyűjti."""
+
+    def __init__(self, pending: PendingFiles) -> None:
+        super().__init__()
+        self.pending = pending
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type in ("deleted", "opened", "closed_no_write"):
+            return
+        path = Path(getattr(event, "dest_path", "") or event.src_path)
+        if FileProcessor.is_input_file(path):
+            self.pending.touch(path)
+
+
+class WatchDaemon:
+    """
+    Hosszan futó figyelő a CSV-eredeti mappára.
+
+    Induláskor egyszer, üres köteggel lefuttatja a feldolgozást (a leállás
+    óta érkezett fájlok miatt), utána minden befejezett köteget átad az on_batch
+    visszahívásnak, amely a manifeszt alapján inkrementálisan dolgozik.
+    """
+
+    def __init__(
+        self,
+        fp: FileProcessor,
+        on_batch: Callable[[list[Path]], None],
+        settle_seconds: float = 2.0,
+        batch_window: float = 5.0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.fp = fp
+        self.on_batch = on_batch
+        self.settle_seconds = settle_seconds
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.pending = PendingFiles()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        observer = Observer()
+        observer.schedule(IngestEventHandler(self.pending), str(self.fp.input_dir), recursive=False)
+        observer.start()
+        logging.info(f"👀 Figyelés indult: {self.fp.input_dir} (nyugalmi idő: {self.settle_seconds}s, kötegablak: {self.batch_window}s)")
+        try:
+            self.on_batch([])
+            while not self._stop.is_set():
+                self._stop.wait(self.poll_interval)
+                batch = self.pending.take_ready(self.settle_seconds, self.batch_window)
+                if batch:
+                    self.on_batch(batch)
+        except KeyboardInterrupt:
+            logging.info("🛑 Figyelés leállítva.")
+        finally:
+            observer.stop()
+            observer.join()
@@ -2,40 +2,285 @@
 # -*- coding: utf-8 -*-
 # EGYSÉGESÍTETT ADATKEZELŐ - v4.1 (JAVÍTOTT)
 
+import sys
 import pandas as pd
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import date, datetime, time
 
+# A tárolók a core modulok között vannak
+CORE_DIR = Path(__file__).resolve().parent / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+from column_cache import ColumnCache, CompactColumns
+from dataset_store import open_existing_store
+from dense_grid import GRID_BUCKET_SLOTS, DenseGrid
+from ingest_manifest import IngestManifest
+from meter_registry import MeterRegistry
+from query_cache import QueryCache
+from range_stats import RangeIndex
+from rollups import ROLLUP_LEVELS, RollupCache
+
+# A GUI intervallumai és a hozzájuk tartozó resample szabályok
+INTERVAL_RULES = {
+    "15min": "15T",
+    "hourly": "H",
+    "daily": "D",
+    "weekly": "W-MON",
+    "monthly": "MS"
+}
+
+# A memóriában tartott adatkészlet kerete (MB); túllépéskor figyelmeztetés,
+# "spill" módban a tömör oszlopok lemezre (memórialeképezett gyorsítótárba) kerülnek
+MEMORY_BUDGET_MB = 256
+OVER_BUDGET_ACTIONS = ("spill", "warn")
+
+# A lekérdezési eredmények LRU gyorsítótárának kerete (MB); 0 = kikapcsolva
+QUERY_CACHE_MB = 32
+
+# SQL pushdown esetén az adatbázisban képzett vödör mérete (másodperc). A heti és
+# havi szabály egész napokat fog össze, ezért ezek a napi összegekből készülnek.
+BUCKET_SECONDS = {
+    "15min": 15 * 60,
+    "hourly": 60 * 60,
+    "daily": 24 * 60 * 60,
+    "weekly": 24 * 60 * 60,
+    "monthly": 24 * 60 * 60,
+}
+
 @dataclass
 class FilterConfig:
     """A GUI által átadott szűrési beállítások."""
     start_date: date
     end_date: date
     interval: str
+    meter: int | None = None  # mérőkód; None = az összes mérő összege
 
 class DataHandler:
     """Osztály a megtisztított adatok beolvasására és szűrésére a GUI számára."""
-    def __init__(self):
+    def __init__(self, memory_budget_mb: float | None = MEMORY_BUDGET_MB, over_budget: str = "spill", query_cache_mb: float = QUERY_CACHE_MB):
+        if over_budget not in OVER_BUDGET_ACTIONS:
+            raise ValueError(f"Ismeretlen művelet: {over_budget} (választható: {OVER_BUDGET_ACTIONS})")
         project_root = next((p for p in Path(__file__).resolve().parents if (p / 'venv').exists()), Path.cwd())
-        self.processed_data_path = project_root / "CSV-normalis" / "energia_adatok_tisztitott.csv"
+        self.output_dir = project_root / "CSV-normalis"
+        self.store = open_existing_store(self.output_dir)
+        self.processed_data_path = self.store.location
         self.electricity_price = 56.07  # Ft/kWh
+        self.memory_budget_mb = memory_budget_mb
+        self.over_budget = over_budget
+        self._memory: CompactColumns | None = None  # CSV tárolónál a teljes fájl tömör alakban, hogy ne olvassuk újra
+        self.dataset_version = 0
+        self.columns = ColumnCache(self.output_dir)
+        self.has_columns = False
+        self.rollups = RollupCache(self.output_dir)
+        self.has_rollups = False
+        self.grid = DenseGrid(self.output_dir)
+        self.has_grid = False
+        self.query_cache = QueryCache(int(query_cache_mb * 2**20))
+        self._ranges: RangeIndex | None = None  # az első időszakos statisztikánál épül
 
-    def load_data(self) -> pd.DataFrame | None:
-        """Betölti az előfeldolgozott és megtisztított adatfájlt."""
-        if not self.processed_data_path.exists():
+    def reload(self) -> bool:
+        """Újranyitja a tárolót (a feldolgozó közben cserélhette); hamis, ha nincs adatkészlet."""
+        self.store = open_existing_store(self.output_dir)
+        self.processed_data_path = self.store.location
+        self._memory = None
+        self._ranges = None
+        dataset_version = IngestManifest(self.output_dir / "ingest_manifest.json").dataset_version
+        if dataset_version != self.dataset_version:
+            self.query_cache.clear()  # a régi verzió eredményei már nem adhatnak találatot
+        self.dataset_version = dataset_version
+        self.has_columns = self.columns.open(self.dataset_version)
+        self.has_rollups = self.rollups.open(self.dataset_version)
+        self.has_grid = self.grid.open(self.dataset_version)
+        if not self.store.exists():
             print(f"HIBA: A feldolgozott adatfájl nem található: {self.processed_data_path}")
+            return False
+        return True
+
+    def load_data(self) -> pd.DataFrame | None:
+        """Betölti a teljes előfeldolgozott és megtisztított adatkészletet."""
+        if not self.reload():
             return None
         try:
-            df = pd.read_csv(self.processed_data_path, sep=";", parse_dates=["Kezdo_datum"])
-            print(f"✅ Adatok betöltve: {len(df)} sor a '{self.processed_data_path.name}' fájlból.")
+            df = self.store.read()
+            print(f"✅ Adatok betöltve: {len(df)} sor a '{self.processed_data_path.name}' tárolóból.")
             return df
         except Exception as e:
             print(f"HIBA az adatfájl beolvasása közben: {e}")
             return None
 
+    def get_date_bounds(self) -> tuple[date, date] | None:
+        """A teljes adatkészlet első és utolsó napja (Parquet tárolónál a partíció-statisztikából)."""
+        if not self.reload():
+            return None
+        try:
+            bounds = self.columns.bounds() if self.has_columns else self.store.bounds()
+        except Exception as e:
+            print(f"HIBA az adatfájl beolvasása közben: {e}")
+            return None
+        if bounds is None:
+            return None
+        return bounds[0].date(), bounds[1].date()
+
+    def meters(self) -> dict[int, str]:
+        """Az adatkészlet mérői: kód → 'gyáriszám / azonosító'."""
+        return MeterRegistry(self.output_dir).labels()
+
+    def load_range(self, start_date: date, end_date: date) -> pd.DataFrame | None:
+        """
+        Csak a kért időszakot fedő adatok beolvasása.
+
+        Elsőként a memóriába leképezett oszlopokból (bináris kereséssel, csak a
+        szelet másolódik). Enélkül Parquet tárolónál csak az átfedő havi
+        partíciók nyílnak meg; a CSV tároló nem particionált, ott a teljes
+        fájl egyszer töltődik be tömör alakban (lásd _load_memory).
+        """
+        if not self.store.exists():
+            return None
+        try:
+            if self.has_columns:
+                return self.columns.read_range(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+            if self.store.name == "csv":
+                if self._memory is None and not self._load_memory():
+                    return self.columns.read_range(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+                return self._memory.read_range(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+            return self.store.read(datetime.combine(start_date, time.min), datetime.combine(end_date, time.max))
+        except Exception as e:
+            print(f"HIBA az adatfájl beolvasása közben: {e}")
+            return None
+
+    def _load_memory(self) -> bool:
+        """
+        A CSV tároló teljes tartalma tömör oszlopokként a memóriába.
+
+        Ha a mérete meghaladja a keretet, "spill" módban a tároló darabonként
+        az oszlop-gyorsítótárba íródik és onnan, memórialeképezve olvasunk
+        (hamis a visszatérési érték); "warn" módban csak figyelmeztetünk.
+        """
+        self._memory = CompactColumns.from_frame(self.store.read())
+        if self.memory_budget_mb is None or self._memory.nbytes <= self.memory_budget_mb * 2**20:
+            return True
+        print(
+            f"⚠️ A betöltött adatkészlet ({self._memory.nbytes / 2**20:.1f} MB, {self._memory.bytes_per_row} bájt/sor) "
+            f"meghaladja a {self.memory_budget_mb} MB-os keretet."
+        )
+        if self.over_budget == "warn":
+            return True
+        self._memory = None
+        self.columns.build(self.store.iter_frames(), self.dataset_version, self.store.name)
+        self.has_columns = self.columns.open(self.dataset_version)
+        print(f"💾 Az adatkészlet lemezre került, memórialeképezve olvasva: {self.columns.root}")
+        return False
+
+    def query_cache_stats(self) -> dict:
+        """A lekérdezési gyorsítótár találatai, tévesztései és foglalt bájtjai."""
+        return self.query_cache.stats()
+
+    def memory_report(self) -> dict:
+        """A lekérdezések forrása, sorai, bájt/sor és memóriában tartott bájtjai (a keret ellenőrzéséhez)."""
+        if self.has_columns:
+            data, source, resident = self.columns.data, "mmap", 0
+        elif self._memory is not None:
+            data, source = self._memory, "memória"
+            resident = data.nbytes
+        else:
+            return {"source": self.store.name, "rows": None, "bytes_per_row": None, "resident_bytes": 0, "budget_mb": self.memory_budget_mb}
+        return {"source": source, "rows": len(data), "bytes_per_row": data.bytes_per_row, "resident_bytes": resident, "budget_mb": self.memory_budget_mb}
+
+    def query(self, config: FilterConfig) -> pd.DataFrame | None:
+        """
+        Betölti a konfiguráció időszakát és szűri/aggregálja (a GUI belépési pontja).
+
+        Az eredmény az LRU gyorsítótárba kerül, így a témaváltás, az ismételt
+        frissítés és az exportok ugyanarra a nézetre nem számolnak újra.
+        """
+        key = (config.start_date, config.end_date, config.interval, config.meter, self.dataset_version)
+        hit, df = self.query_cache.lookup(key)
+        if not hit:
+            df = self._query_uncached(config)
+            self.query_cache.store(key, df)
+        return df
+
+    def _query_uncached(self, config: FilterConfig) -> pd.DataFrame | None:
+        if self.has_grid and (config.interval in GRID_BUCKET_SLOTS or not self.has_rollups and config.interval in INTERVAL_RULES):
+            return self._query_grid(config)
+        if self.has_rollups and config.interval in ROLLUP_LEVELS:
+            return self._query_rollups(config)
+        if self.store.pushdown and config.interval in BUCKET_SECONDS:
+            return self._query_pushdown(config)
+        return self.filter_data(self.load_range(config.start_date, config.end_date), config)
+
+    def _query_grid(self, config: FilterConfig) -> pd.DataFrame | None:
+        """
+        Intervallum a 15 perces rácsból: negyedórás, órás és napi vödör szeletelés + reshape.
+
+        A heti és havi vödör (ha nincsenek összesítő táblák) a rács napi
+        összegeiből képződik, nem a negyedórás sorokból.
+        """
+        start_dt = datetime.combine(config.start_date, time.min)
+        end_dt = datetime.combine(config.end_date, time.max)
+        if config.interval in GRID_BUCKET_SLOTS:
+            series = self.grid.sums(config.interval, start_dt, end_dt, config.meter)
+            return None if series.empty else series.reset_index()
+        series = self.grid.sums("daily", start_dt, end_dt, config.meter)
+        if series.empty:
+            return None
+        return series.resample(INTERVAL_RULES[config.interval]).sum().reset_index()
+
+    def missing_slots(self, config: FilterConfig) -> int | None:
+        """A hiányzó negyedórák száma a konfiguráció időszakában; None, ha nincs 15 perces rács."""
+        if not self.has_grid:
+            return None
+        return self.grid.missing_count(
+            datetime.combine(config.start_date, time.min), datetime.combine(config.end_date, time.max), config.meter
+        )
+
+    def _query_rollups(self, config: FilterConfig) -> pd.DataFrame | None:
+        """
+        Durva intervallum az előre összegzett táblákból, nyers sorok nélkül.
+
+        A belső vödrök a kért szint táblájából jönnek, a csonka szélső vödrök
+        (pl. hónap közepén kezdődő havi nézet) a finomabb szintekből (lásd
+        RollupCache.sums), így egy havi nézet havonta egy sort olvas. Ha egy
+        csonka órás vödörhöz nyers sorok kellenének, a nyers úton számolunk.
+        """
+        start_dt = datetime.combine(config.start_date, time.min)
+        end_dt = datetime.combine(config.end_date, time.max)
+        series = self.rollups.sums(config.interval, start_dt, end_dt, config.meter)
+        if series is None:
+            return self.filter_data(self.load_range(config.start_date, config.end_date), config)
+        if series.empty:
+            return None
+        return series.resample(INTERVAL_RULES[config.interval]).sum().reset_index()
+
+    def _query_pushdown(self, config: FilterConfig) -> pd.DataFrame | None:
+        """
+        Időszak-szűrés és vödrönkénti összegzés az adatbázisban.
+
+        A pandasba csak a vödrök kerülnek; a resample ezekből pótolja az üres
+        vödröket és képzi a heti/havi összegeket, így az eredmény megegyezik a
+        filter_data-éval.
+        """
+        start_dt = datetime.combine(config.start_date, time.min)
+        end_dt = datetime.combine(config.end_date, time.max)
+        try:
+            buckets = self.store.aggregate(start_dt, end_dt, BUCKET_SECONDS[config.interval], config.meter)
+        except Exception as e:
+            print(f"HIBA az adatbázis lekérdezése közben: {e}")
+            return None
+        if buckets.empty:
+            return None
+        series = buckets.set_index('Kezdo_datum')['Hatasos_ertek_kWh']
+        return series.resample(INTERVAL_RULES[config.interval]).sum().reset_index()
+
     def filter_data(self, df: pd.DataFrame | None, config: FilterConfig) -> pd.DataFrame | None:
-        """Szűri és aggregálja az adatokat a megadott konfiguráció alapján."""
+        """
+        Szűri és aggregálja az adatokat a megadott konfiguráció alapján.
+
+        A tárolók időrendben (Kezdo_datum szerint rendezve) adják vissza az
+        adatokat, ezért az időszak két bináris kereséssel, másolás nélküli
+        szeletként választódik ki; maszk csak a mérő szűréséhez, a szeleten készül.
+        """
         if df is None or df.empty:
             return None
 
@@ -43,34 +288,113 @@ class DataHandler:
         start_dt = datetime.combine(config.start_date, time.min)
         end_dt = datetime.combine(config.end_date, time.max)
 
-        mask = (df['Kezdo_datum'] >= start_dt) & (df['Kezdo_datum'] <= end_dt)
-        filtered_df = df.loc[mask].copy()
+        ts = df['Kezdo_datum'].to_numpy()
+        lo = int(ts.searchsorted(pd.Timestamp(start_dt).to_datetime64(), side="left"))
+        hi = int(ts.searchsorted(pd.Timestamp(end_dt).to_datetime64(), side="right"))
+        window = df.iloc[lo:hi]
+        if config.meter is not None:
+            window = window[window['Mero_kod'].to_numpy() == config.meter]
 
-        if filtered_df.empty:
+        if window.empty:
             return None
 
-        # Idősoros index beállítása a resample funkcióhoz
-        filtered_df.set_index('Kezdo_datum', inplace=True)
-
-        interval_map = {
-            "15min": "15T",
-            "hourly": "H",
-            "daily": "D",
-            "weekly": "W-MON",
-            "monthly": "MS"
-        }
-        resample_rule = interval_map.get(config.interval)
+        resample_rule = INTERVAL_RULES.get(config.interval)
 
         if resample_rule:
-            # Csak akkor aggregálunk, ha van értelmes szabály
-            aggregated_df = filtered_df['Hatasos_ertek_kWh'].resample(resample_rule).sum().reset_index()
-            return aggregated_df
+            # Csak akkor aggregálunk, ha van értelmes szabály; az idősor a szelet oszlopaira épül
+            series = pd.Series(
+                window['Hatasos_ertek_kWh'].to_numpy(),
+                index=pd.DatetimeIndex(window['Kezdo_datum'].to_numpy(), name='Kezdo_datum'),
+                name='Hatasos_ertek_kWh',
+            )
+            return series.resample(resample_rule).sum().reset_index()
         else:
             # Ha nincs aggregálás (pl. "15 perces"), visszaadjuk a szűrt adatot
-            return filtered_df.reset_index()
+            return window.set_index('Kezdo_datum').reset_index()
+
+    def query_by_meter(self, config: FilterConfig) -> pd.DataFrame | None:
+        """Mérőnkénti bontás: a query() eredménye minden mérőre, Mero_kod oszloppal összefűzve."""
+        frames = []
+        for code in self.meters():
+            df = self.query(replace(config, meter=code))
+            if df is not None:
+                frames.append(df.assign(Mero_kod=code))
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+    def _range_index(self) -> RangeIndex | None:
+        """Az időszakos statisztikák indexe a tömör oszlopok fölött (oszlop-gyorsítótár, memória vagy a tároló)."""
+        if self._ranges is None:
+            try:
+                if self.has_columns:
+                    columns = self.columns.data
+                elif self.store.name == "csv" and (self._memory is not None or self._load_memory()):
+                    columns = self._memory
+                elif self.has_columns:  # a _load_memory lemezre írta
+                    columns = self.columns.data
+                else:
+                    columns = CompactColumns.from_frame(self.store.read())
+            except Exception as e:
+                print(f"HIBA az adatfájl beolvasása közben: {e}")
+                return None
+            self._ranges = RangeIndex(columns)
+        return self._ranges
 
-    def calculate_statistics(self, df: pd.DataFrame | None) -> dict:
-        """Kiszámolja a statisztikákat a szűrt adatkészlet alapján."""
+    def range_statistics(self, config: FilterConfig) -> dict | None:
+        """
+        Az időszak összege, mérésszáma, átlaga, szélsőértékei és a becslések az indexből.
+
+        Az eredmény az intervallumtól független (a nyers negyedórás mérésekre
+        vonatkozik): az összeg két kumulált érték különbsége, a minimum és a
+        maximum (a csúcs időpontjával) a ritka táblából jön, így a költség az
+        időszak hosszától független. None, ha nincs adat az időszakban.
+        """
+        ranges = self._range_index()
+        if ranges is None:
+            return None
+        start_dt = datetime.combine(config.start_date, time.min)
+        end_dt = datetime.combine(config.end_date, time.max)
+        totals = ranges.totals(start_dt, end_dt, config.meter)
+        if totals is None:
+            return None
+        low = ranges.extreme(start_dt, end_dt, config.meter, largest=False)
+        peak = ranges.extreme(start_dt, end_dt, config.meter, largest=True)
+        return {
+            'total': totals.total,
+            'count': totals.count,
+            'avg': totals.mean,
+            'min': low.value,
+            'min_at': low.at,
+            'max': peak.value,
+            'max_at': peak.at,
+            'first': totals.first,
+            'last': totals.last,
+            **self._estimates(totals.total, totals.days),
+        }
+
+    def _estimates(self, total: float, num_days: int) -> dict:
+        """Napi átlag, havi és éves becslés (kWh és Ft) az összegből és a napok számából."""
+        daily_avg = total / num_days if num_days > 0 else 0
+        monthly_est = daily_avg * 30.44  # Átlagos hónap hossza
+        yearly_est = daily_avg * 365.25 # Szökőévekkel is számolva
+        return {
+            'daily_avg': daily_avg,
+            'monthly_est': monthly_est,
+            'monthly_cost': monthly_est * self.electricity_price,
+            'yearly_est': yearly_est,
+            'yearly_cost': yearly_est * self.electricity_price,
+        }
+
+    def calculate_statistics(self, df: pd.DataFrame | None, config: FilterConfig | None = None) -> dict:
+        """
+        Kiszámolja a statisztikákat a szűrt adatkészlet alapján.
+
+        Az átlag, a minimum és a maximum mindig a megjelenített vödrökre
+        vonatkozik. Ha a konfiguráció is adott, az összeg és a becslések az
+        indexből (range_statistics) jönnek, és külön kulcson (peak_15min,
+        peak_15min_at) a legnagyobb negyedórás mérés is, időponttal.
+        """
         if df is None or df.empty:
             # Üres szótár, ha nincs adat
             return {
@@ -80,24 +404,18 @@ class DataHandler:
             }
 
         consumption = df['Hatasos_ertek_kWh']
+        stats = {'avg': consumption.mean(), 'min': consumption.min(), 'max': consumption.max()}
+        totals = self.range_statistics(config) if config is not None else None
+        if totals is not None:
+            keys = ('total', 'daily_avg', 'monthly_est', 'monthly_cost', 'yearly_est', 'yearly_cost')
+            stats.update({key: totals[key] for key in keys})
+            stats['peak_15min'], stats['peak_15min_at'] = totals['max'], totals['max_at']
+            return stats
+
         total_consumption = consumption.sum()
 
         # Időszak hosszának kiszámítása napokban a valós adatok alapján
         num_days = (df['Kezdo_datum'].max() - df['Kezdo_datum'].min()).days + 1
-        daily_avg = total_consumption / num_days if num_days > 0 else 0
-        
-        monthly_est = daily_avg * 30.44  # Átlagos hónap hossza
-        yearly_est = daily_avg * 365.25 # Szökőévekkel is számolva
-
-        stats = {
-            'avg': consumption.mean(),
-            'min': consumption.min(),
-            'max': consumption.max(),
-            'total': total_consumption,
-            'daily_avg': daily_avg,
-            'monthly_est': monthly_est,
-            'monthly_cost': monthly_est * self.electricity_price,
-            'yearly_est': yearly_est,
-            'yearly_cost': yearly_est * self.electricity_price
-        }
+        stats['total'] = total_consumption
+        stats.update(self._estimates(total_consumption, num_days))
         return stats
@@ -34,7 +34,8 @@ class EnergyMonitorApp(ctk.CTk):
 
         self.data_handler = DataHandler()
         self.export_mgr = ExportManager()
-        self.current_df = None
+        self.data_bounds = None
+        self.meter_codes = {}  # a mérőválasztó felirata → mérőkód
 
         self.setup_ui()
         self.load_data()
@@ -116,6 +117,14 @@ class EnergyMonitorApp(ctk.CTk):
         self.interval.pack(pady=10, padx=10, fill="x")
         self.interval.set("Napi")
 
+        self.meter = ctk.CTkComboBox(
+            frame,
+            values=["Összes mérő"],
+            font=("Ubuntu", 12)
+        )
+        self.meter.pack(pady=(0, 10), padx=10, fill="x")
+        self.meter.set("Összes mérő")
+
         ctk.CTkButton(frame, text="🔄 Frissítés", command=self.refresh_chart, font=("Ubuntu", 13, "bold")).pack(pady=10, padx=10, fill="x")
         ctk.CTkButton(frame, text="📊 Excel Export", command=self.export_excel, font=("Ubuntu", 12)).pack(pady=5, padx=10, fill="x")
         ctk.CTkButton(frame, text="📄 PDF Riport", command=self.export_pdf, font=("Ubuntu", 12)).pack(pady=5, padx=10, fill="x")
@@ -149,8 +158,10 @@ class EnergyMonitorApp(ctk.CTk):
         self.status_label.configure(text="⏳ Adatok betöltése...")
         self.update()
 
-        self.current_df = self.data_handler.load_data()
-        if self.current_df is not None:
+        self.data_bounds = self.data_handler.get_date_bounds()
+        if self.data_bounds is not None:
+            self.meter_codes = {label: code for code, label in self.data_handler.meters().items()}
+            self.meter.configure(values=["Összes mérő"] + list(self.meter_codes))
             # FONTOS: állítsuk be a dátumokat az aktuális adatkészlethez
             # a quick_pick.set NEM hívja meg a logikát, ezért kézzel triggerelem
             self.quick_pick.set("Teljes adatkészlet")
@@ -176,9 +187,8 @@ class EnergyMonitorApp(ctk.CTk):
             prev_month_start = prev_month_end.replace(day=1)
             self.start_date.set_date(prev_month_start)
             self.end_date.set_date(prev_month_end)
-        elif choice == "Teljes adatkészlet" and self.current_df is not None:
-            min_date = self.current_df["Kezdo_datum"].min().date()
-            max_date = self.current_df["Kezdo_datum"].max().date()
+        elif choice == "Teljes adatkészlet" and self.data_bounds is not None:
+            min_date, max_date = self.data_bounds
             self.start_date.set_date(min_date)
             self.end_date.set_date(max_date)
 
@@ -199,9 +209,10 @@ class EnergyMonitorApp(ctk.CTk):
             start_date=self.start_date.get_date(),
             end_date=self.end_date.get_date(),
             interval=interval_map[self.interval.get()],
+            meter=self.meter_codes.get(self.meter.get()),
         )
 
-        filtered_df = self.data_handler.filter_data(self.current_df, config)
+        filtered_df = self.data_handler.query(config)
 
         if filtered_df is None or filtered_df.empty:
             messagebox.showwarning("Hiba", "Nincs adat a kiválasztott időszakban")
@@ -245,12 +256,12 @@ class EnergyMonitorApp(ctk.CTk):
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
 
-        self.update_statistics(filtered_df)
+        self.update_statistics(filtered_df, config)
         self.status_label.configure(text=f"✅ Grafikon kész ({len(filtered_df)} adatpont)")
 
-    def update_statistics(self, df):
-        """Statisztikák frissítése."""
-        stats = self.data_handler.calculate_statistics(df)
+    def update_statistics(self, df, config=None):
+        """Statisztikák frissítése (az összeg és a becslések a teljes időszakra, prefix-összegekből)."""
+        stats = self.data_handler.calculate_statistics(df, config)
 
         stats_text = f"""📊 ALAPADATOK
 
@@ -260,7 +271,7 @@ class EnergyMonitorApp(ctk.CTk):
 Minimum:  {stats['min']:.2f} kWh
 
 Maximum:  {stats['max']:.2f} kWh
-
+{self._format_peak(stats)}
 Összesen:  {stats['total']:.2f} kWh
 
 
@@ -287,6 +298,13 @@ Havi becslés:
         self.stats_text.insert("1.0", stats_text)
         self.stats_text.configure(state="disabled")
 
+    @staticmethod
+    def _format_peak(stats: dict) -> str:
+        """A legnagyobb negyedórás mérés külön sorban, időponttal (ha ismert)."""
+        if stats.get('peak_15min') is None:
+            return ""
+        return f"\nNegyedórás csúcs:  {stats['peak_15min']:.2f} kWh\n    ({stats['peak_15min_at']:%Y.%m.%d. %H:%M})\n"
+
     def toggle_theme(self):
         """Téma váltás dark/light között."""
         if self.theme_switch.get():
@@ -296,7 +314,7 @@ Havi becslés:
             ctk.set_appearance_mode("light")
             self.theme_switch.configure(text="☀️")
         
-        if self.current_df is not None:
+        if self.data_bounds is not None:
             self.refresh_chart()
 
     def export_excel(self):
@@ -316,9 +334,10 @@ Havi becslés:
             start_date=self.start_date.get_date(),
             end_date=self.end_date.get_date(),
             interval=interval_map[self.interval.get()],
+            meter=self.meter_codes.get(self.meter.get()),
         )
 
-        filtered_df = self.data_handler.filter_data(self.current_df, config)
+        filtered_df = self.data_handler.query(config)
         success = self.export_mgr.export_excel(filtered_df, config)
 
         if success:
@@ -344,9 +363,10 @@ Havi becslés:
             start_date=self.start_date.get_date(),
             end_date=self.end_date.get_date(),
             interval=interval_map[self.interval.get()],
+            meter=self.meter_codes.get(self.meter.get()),
         )
 
-        filtered_df = self.data_handler.filter_data(self.current_df, config)
+        filtered_df = self.data_handler.query(config)
         
         from charts_module import ChartGenerator
         chart_gen = ChartGenerator(theme="dark")
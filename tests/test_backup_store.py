@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# BIZTONSÁGI MENTÉSEK: MEGŐRZÉS FORRÁSONKÉNT
+
+import os
+import sys
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parents[1] / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+import backup_store
+from backup_store import BackupStore
+
+
+def test_retention_keeps_latest_per_source_and_reason(tmp_path):
+    backups = BackupStore(tmp_path / "backups", keep_daily=1, keep_monthly=1)
+    csv_path = tmp_path / "adatok.csv"
+    store_dir = tmp_path / "adatok.parquet"
+    (store_dir / "year=2024").mkdir(parents=True)
+    csv_path.write_text("Kezdo_datum;kWh\n2024-01-01 00:00:00;1\n", encoding="utf-8")
+    (store_dir / "year=2024" / "data.parquet").write_bytes(b"PAR1")
+
+    csv_write = backups.snapshot(csv_path)
+    pre_restore = backups.snapshot(csv_path, retention=False, reason="restore")
+    csv_path.write_text("Kezdo_datum;kWh\n2024-01-01 00:00:00;2\n", encoding="utf-8")
+    backups.snapshot(csv_path)
+    parquet_write = backups.snapshot(store_dir)
+
+    kept = {s.id for s in backups.list_snapshots()}
+    assert csv_write.id not in kept  # ugyanazon a napon egy újabb CSV mentés váltotta
+    assert pre_restore.id in kept and parquet_write.id in kept
+    assert len(kept) == 3
+
+
+def test_directory_snapshot_reuses_unchanged_files(tmp_path, monkeypatch):
+    backups = BackupStore(tmp_path / "backups")
+    store_dir = tmp_path / "adatok.segments"
+    store_dir.mkdir()
+    for name, data in (("seg_00000001.npy", b"a" * 100), ("segments.json", b"{}")):
+        (store_dir / name).write_bytes(data)
+        os.utime(store_dir / name, ns=(10**18, 10**18))
+    backups.snapshot(store_dir)
+
+    (store_dir / "segments.json").write_bytes(b'{"v": 2}')
+    os.utime(store_dir / "segments.json", ns=(10**18 + 10**9, 10**18 + 10**9))
+    read = []
+    chunker = backup_store.iter_file_chunks
+    monkeypatch.setattr(backup_store, "iter_file_chunks", lambda path: read.append(path.name) or chunker(path))
+    second = backups.snapshot(store_dir)
+    assert read == ["segments.json"]
+
+    target = tmp_path / "visszaallitott.segments"
+    assert backups.restore(second, target)
+    assert (target / "seg_00000001.npy").read_bytes() == b"a" * 100
+    assert (target / "segments.json").read_bytes() == b'{"v": 2}'
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# OSZLOP-GYORSÍTÓTÁR: PONTOS kWh ÉRTÉKEK
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+CORE_DIR = Path(__file__).resolve().parents[1] / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+from column_cache import ColumnCache, CompactColumns
+from range_stats import RangeIndex
+
+
+def frame(value: float, rows: int = 96 * 3) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Kezdo_datum': pd.date_range("2024-01-01", periods=rows, freq="15min"),
+        'Mero_kod': np.zeros(rows, dtype="int32"),
+        'Hatasos_ertek_kWh': np.full(rows, value),
+    })
+
+
+@pytest.mark.parametrize("value, unit", [(0.123, "Wh"), (0.1234, "kWh")])
+def test_kwh_round_trip_is_exact(tmp_path, value, unit):
+    df = frame(value)
+    cache = ColumnCache(tmp_path)
+    cache.build([df.iloc[:100], df.iloc[100:]], 1, "csv")
+    assert cache.open(1)
+    for columns in (cache.data, CompactColumns.from_frame(df)):
+        assert columns.kwh_unit == unit
+        assert (columns.read_range()['Hatasos_ertek_kWh'] == value).all()
+
+
+def test_wh_totals_are_exact():
+    totals = RangeIndex(CompactColumns.from_frame(frame(0.123))).totals()
+    assert totals.total == 35.424 and totals.count == 288
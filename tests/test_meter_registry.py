@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# MÉRŐ-SZÓTÁR: ÜRES BEMENET
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+CORE_DIR = Path(__file__).resolve().parents[1] / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+from dataset_store import OUTPUT_COLUMNS, output_frame
+from meter_registry import METER_DTYPE, MeterRegistry
+
+EMPTY = pd.DataFrame({
+    'Gyariszam': pd.Series(dtype=object),
+    'Azonosito': pd.Series(dtype=object),
+    'Kezdo_datum': pd.Series(dtype="datetime64[ns]"),
+    'Hatasos_ertek_kWh': pd.Series(dtype="float64"),
+})
+
+
+def test_encode_empty_frame(tmp_path):
+    registry = MeterRegistry(tmp_path)
+    codes = registry.encode(EMPTY)
+    assert len(codes) == 0 and codes.dtype == METER_DTYPE
+    assert registry.labels() == {}
+
+
+def test_output_frame_empty(tmp_path):
+    out = output_frame(EMPTY, MeterRegistry(tmp_path))
+    assert out.empty and list(out.columns) == OUTPUT_COLUMNS
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# SQLITE TÁROLÓ: HIÁNYZÓ ADATBÁZIS
+
+import sys
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parents[1] / "core"
+if str(CORE_DIR) not in sys.path:
+    sys.path.insert(0, str(CORE_DIR))
+from sqlite_store import SqliteStore
+
+
+def test_missing_database_is_not_created(tmp_path):
+    store = SqliteStore(tmp_path)
+    assert store.bounds() is None
+    assert list(store.iter_frames()) == []
+    assert store.read() is None
+    assert store.aggregate(None, None, 3600).empty
+    assert not store.location.exists()